@@ -1,6 +1,7 @@
-from . import models
+from . import models, search
 
 from django.contrib import admin
+from django.db.models import Count, Max
 from treebeard.admin import TreeAdmin
 from treebeard.forms import movenodeform_factory
 
@@ -33,6 +34,22 @@ class TickerItemAdmin(admin.ModelAdmin):
     date_hierarchy = 'pub_dt'
     inlines = [TickerRefInlineAdmin]
 
+    def get_search_results(self, request, queryset, search_term):
+        # uses the full text index (newsticker.search) instead of icontains over the HTML
+        if not search_term.strip():
+            return queryset, False
+        return search.search(queryset, search_term), False
+
+    def save_model(self, request, obj, form, change):
+        # summary stats are refreshed once all inline refs are saved
+        with models.defer_summary_refresh():
+            super().save_model(request, obj, form, change)
+
+    def save_related(self, request, form, formsets, change):
+        with models.defer_summary_refresh():
+            super().save_related(request, form, formsets, change)
+        form.instance.refresh_summary()
+
 
 class TickerRefAdmin(admin.ModelAdmin):
     list_display = ['item', 'is_in_summary', 'ref_type', 'index', 'url', 'uploadfile',]
@@ -40,20 +57,36 @@ class TickerRefAdmin(admin.ModelAdmin):
 
 
 class ShareLinkAdmin(admin.ModelAdmin):
-    list_display = ['short', 'display_date', 'display_days', 'valid_until', 'clicks_counter', 'resolve_url', 'get_short_link_url', 'shared_with_notes', 'absolute_url']
+    list_display = ['short', 'display_date', 'display_days', 'valid_until', 'clicks_counter', 'logged_clicks', 'last_click', 'resolve_url', 'get_short_link_url', 'shared_with_notes', 'absolute_url']
 
     def get_queryset(self, request):
         qs = super(ShareLinkAdmin, self).get_queryset(request)
+        qs = qs.annotate(logged_clicks=Count('clicks'), last_click=Max('clicks__ts'))
         self.request = request
         return qs
 
+    @admin.display(ordering='logged_clicks')
+    def logged_clicks(self, obj):
+        return obj.logged_clicks
+
+    @admin.display(ordering='last_click')
+    def last_click(self, obj):
+        return obj.last_click
+
     def absolute_url(self, obj):
         return self.request.build_absolute_uri(obj.get_short_link_url())
 
 
+class ShareLinkClickAdmin(admin.ModelAdmin):
+    list_display = ['sharelink', 'ts', 'user_name', 'user_agent']
+    list_select_related = ['sharelink']
+    date_hierarchy = 'ts'
+
+
 admin.site.register(models.TickerCategory, TickerCategoryAdmin)
 admin.site.register(models.TickerPublication, TickerPublicationAdmin)
 admin.site.register(models.TickerItemType, TickerItemTypeAdmin)
 admin.site.register(models.TickerItem, TickerItemAdmin)
 admin.site.register(models.TickerRef, TickerRefAdmin)
 admin.site.register(models.ShareLink, ShareLinkAdmin)
+admin.site.register(models.ShareLinkClick, ShareLinkClickAdmin)
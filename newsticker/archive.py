@@ -0,0 +1,175 @@
+import logging
+import posixpath
+from collections import Counter
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+
+from . import daycache, digests, filestore
+
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_FILES_PREFIX = 'newsticker/archive/files'
+
+
+def get_archive_after_days():
+    return getattr(settings, 'NEWSTICKER_ARCHIVE_AFTER_DAYS', 730)
+
+
+def get_sharelink_grace_days():
+    # expired share links are kept this long (their clicks with them)
+    return getattr(settings, 'NEWSTICKER_SHARELINK_PURGE_AFTER_DAYS', 90)
+
+
+def protected_ids(cutoff):
+    # Items before cutoff that stay because items staying in the hot table link to them
+    # (directly or through other protected items), so their linked_tickeritem stays resolvable
+    from .models import TickerRef
+
+    protected = set(TickerRef.objects.filter(
+        item__pub_dt__gte=cutoff, linked_tickeritem__pub_dt__lt=cutoff
+    ).values_list('linked_tickeritem_id', flat=True))
+    frontier = set(protected)
+    while frontier:
+        frontier = set(TickerRef.objects.filter(
+            item_id__in=frontier, linked_tickeritem__isnull=False
+        ).values_list('linked_tickeritem_id', flat=True)) - protected
+        protected |= frontier
+    return protected
+
+
+def archived_path(name):
+    return posixpath.join(ARCHIVE_FILES_PREFIX, name.split('newsticker/files/', 1)[-1])
+
+
+def archive_data(item, file_names, linked_from=()):
+    refs = []
+    for ref in item.tickerref_set.all():
+        name = ref.uploadfile.name if ref.uploadfile else None
+        refs.append({
+            'id': ref.pk,
+            'ref_type': ref.ref_type,
+            'index': ref.index,
+            'url': ref.url,
+            'uploadfile': file_names.get(name, name),
+            'linked_tickeritem': ref.linked_tickeritem_id,
+            'linked_headline': ref.linked_tickeritem.headline if ref.linked_tickeritem_id else None,
+            'title': ref.title,
+            'text': ref.text,
+            'is_in_summary': ref.is_in_summary,
+        })
+    return {
+        'category': {'id': item.category_id, 'name': item.category.name, 'path': item.category.path},
+        'publication': {'id': item.publication_id, 'name': item.publication.name},
+        'item_type': {'id': item.item_type_id, 'name': item.item_type.name},
+        'created_dt': item.created_dt.isoformat(),
+        'modified_dt': item.modified_dt.isoformat(),
+        'summary': item.summary,
+        'rendered_summary': item.rendered_summary,
+        'refs': refs,
+        # refs of items archived later, their linked_tickeritem is set NULL by this delete
+        'linked_from_refs': sorted(linked_from),
+    }
+
+
+def move_files(names):
+    # Moves uploads below ARCHIVE_FILES_PREFIX, names that are gone are skipped
+    for name in names:
+        try:
+            if not default_storage.exists(name):
+                continue
+            # already there from an interrupted run
+            if not default_storage.exists(archived_path(name)):
+                with default_storage.open(name, 'rb') as f:
+                    default_storage.save(archived_path(name), f)
+            default_storage.delete(name)
+        except OSError:
+            logger.exception('Moving %s to the archive failed', name)
+
+
+def archive_chunk(ids, move_uploads=True):
+    from .models import TickerItem, TickerItemArchive, TickerRef
+
+    with transaction.atomic():
+        items = list(TickerItem.objects.with_relations(TickerItem.objects.filter(pk__in=ids)))
+        linked_from = {}
+        for ref_pk, linked_pk in TickerRef.objects.filter(linked_tickeritem_id__in=ids).exclude(
+                item_id__in=ids).values_list('pk', 'linked_tickeritem_id'):
+            linked_from.setdefault(linked_pk, []).append(ref_pk)
+        uploads = [ref.uploadfile.name for item in items for ref in item.tickerref_set.all() if ref.uploadfile]
+        file_names = {}
+        if move_uploads:
+            # content addressed files may be shared with hot refs, they stay where they are, and so
+            # do upload_to files refs of remaining items still use
+            names = {name for name in uploads if not filestore.is_content_addressed(name)}
+            names -= set(TickerRef.objects.filter(uploadfile__in=names).exclude(item_id__in=ids).values_list(
+                'uploadfile', flat=True))
+            file_names = {name: archived_path(name) for name in names}
+        # the archive keeps its own reference, the delete below releases the refs' ones
+        for name, count in Counter(uploads).items():
+            filestore.acquire(name, count)
+        TickerItemArchive.objects.bulk_create([
+            TickerItemArchive(
+                id=item.pk,
+                pub_dt=item.pub_dt,
+                category_id=item.category_id,
+                headline=item.headline,
+                external_id=item.external_id,
+                data=archive_data(item, file_names, linked_from.get(item.pk, ())),
+            )
+            for item in items
+        ], ignore_conflicts=True)
+        # refs and search documents cascade, links from other archived items are set NULL
+        TickerItem.objects.filter(pk__in=[item.pk for item in items]).delete()
+        digests.refresh_items(items)
+        daycache.invalidate_items(items)
+        if file_names:
+            transaction.on_commit(lambda: move_files(file_names))
+    return len(items), sum(len(item.tickerref_set.all()) for item in items), len(file_names)
+
+
+def archive_items(cutoff, chunk_size=500, move_uploads=True, dry_run=False):
+    # Archives the items published before cutoff in chunks of chunk_size, one transaction each.
+    # Returns (items, refs, files, protected items).
+    from .models import TickerItem
+
+    protected = protected_ids(cutoff)
+    qs = TickerItem.objects.filter(pub_dt__lt=cutoff).order_by('pk')
+    items = refs = files = 0
+    last_pk = 0
+    while True:
+        ids = [pk for pk in qs.filter(pk__gt=last_pk).values_list('pk', flat=True)[:chunk_size]]
+        if not ids:
+            break
+        last_pk = ids[-1]
+        ids = [pk for pk in ids if pk not in protected]
+        if dry_run:
+            items += len(ids)
+            continue
+        if ids:
+            chunk_items, chunk_refs, chunk_files = archive_chunk(ids, move_uploads=move_uploads)
+            items += chunk_items
+            refs += chunk_refs
+            files += chunk_files
+    return items, refs, files, len(protected)
+
+
+def purge_sharelinks(expired_before, chunk_size=500, dry_run=False):
+    # Deletes share links that expired before expired_before (with their clicks), their cache
+    # entries go through the post_delete receiver (models.sharelink_changed)
+    from .models import ShareLink
+
+    qs = ShareLink.objects.filter(valid_until__lt=expired_before).order_by('pk')
+    if dry_run:
+        return qs.count()
+    purged = 0
+    while True:
+        pks = list(qs.values_list('pk', flat=True)[:chunk_size])
+        if not pks:
+            break
+        with transaction.atomic():
+            ShareLink.objects.filter(pk__in=pks).delete()
+        purged += len(pks)
+    return purged
@@ -0,0 +1,59 @@
+from .corpus import summary_corpus
+from .generator import Dataset, generate, generated
+from .results import compare, dump, load, metadata
+from .scenarios import (
+    bench_admin_changelists, bench_current_by_date, bench_render, bench_rendered_summary, bench_search,
+    bench_sharelink_clicks, bench_sharelink_create, bench_urls,
+)
+
+
+__all__ = [
+    'Dataset', 'ON_DATASET', 'SCENARIOS', 'STANDALONE', 'compare', 'dump', 'generate', 'generated', 'load',
+    'metadata', 'run', 'summary_corpus',
+]
+
+
+# scenarios without a generated dataset: name -> (function, options used)
+STANDALONE = {
+    'render': (bench_render, ['count', 'repeat', 'seed']),
+    'search': (bench_search, ['count', 'seed']),
+    'sharelinks': (bench_sharelink_create, ['count', 'strategy']),
+    'urls': (bench_urls, ['count', 'repeat']),
+}
+
+# scenarios on the data of generate(): name -> (function, options used)
+ON_DATASET = {
+    'current': (bench_current_by_date, ['repeat']),
+    'summaries': (bench_rendered_summary, ['repeat']),
+    'clicks': (bench_sharelink_clicks, ['count']),
+    'admin': (bench_admin_changelists, ['repeat']),
+}
+
+SCENARIOS = list(STANDALONE) + list(ON_DATASET)
+
+
+def run(scenarios, dataset_params=None, **options):
+    # Returns a JSON serialisable report: {'meta': ..., 'dataset': ..., 'results': {scenario: {...}}}
+    results = {}
+    for name in scenarios:
+        if name in STANDALONE:
+            func, keys = STANDALONE[name]
+            results[name] = func(**{key: options[key] for key in keys if key in options})
+
+    report = {'meta': metadata(scenarios=scenarios, dataset=dataset_params, **options), 'results': results}
+    dataset_scenarios = [name for name in scenarios if name in ON_DATASET]
+    if dataset_scenarios:
+        with generated(**(dataset_params or {})) as dataset:
+            report['dataset'] = {
+                'items': len(dataset.item_ids),
+                'refs': dataset.ref_count,
+                'categories': len(dataset.category_ids),
+                'sharelinks': len(dataset.sharelink_ids),
+                'clicks': dataset.click_count,
+            }
+            for name in dataset_scenarios:
+                func, keys = ON_DATASET[name]
+                results[name] = func(dataset, **{key: options[key] for key in keys if key in options})
+    # keep the requested order
+    report['results'] = {name: results[name] for name in scenarios}
+    return report
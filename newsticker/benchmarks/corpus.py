@@ -0,0 +1,55 @@
+import random
+
+from .. import rendering
+
+
+WORDS = (
+    'Bundestag Landtag Antrag Haushalt Klimaschutz Energiewende Verkehr Bildung Kommune Fraktion '
+    'Ausschuss Gesetz Entwurf Abstimmung Regierung Opposition Pressemitteilung Interview Anhörung '
+    'Förderung Millionen Euro Prozent Bürgerinnen Bürger Stadt Land Bund Europa Wahl Kreis'
+).split()
+ABBREVIATIONS = [('EU', 'Europäische Union'), ('ÖPNV', 'Öffentlicher Personennahverkehr'), ('KfW', 'Kreditanstalt für Wiederaufbau')]
+
+
+def _sentence(rnd, markers):
+    words = [rnd.choice(WORDS) for _ in range(rnd.randint(6, 18))]
+    for pos in rnd.sample(range(len(words)), markers):
+        words[pos] = f'<span class="marker">{rnd.choice([words[pos], "^"])}</span>'
+    if rnd.random() < 0.3:
+        pos = rnd.randrange(len(words))
+        words[pos] = f'<strong>{words[pos]}</strong>'
+    if rnd.random() < 0.2:
+        words.append('&amp; mehr&nbsp;…')
+    return ' '.join(words) + '.'
+
+
+def summary_corpus(count, seed=0):
+    # Summaries as written in the CKEditor: paragraphs, lists, markers and matching refs
+    rnd = random.Random(seed)
+    corpus = []
+    for n in range(count):
+        specs = []
+        paragraphs = []
+        for _ in range(rnd.randint(1, 4)):
+            markers = rnd.choice([0, 1, 1, 2])
+            if rnd.random() < 0.15:
+                items = ''.join(f'<li>{_sentence(rnd, 0)}</li>' for _ in range(rnd.randint(2, 4)))
+                paragraphs.append(f'<ul>{items}</ul>')
+            else:
+                paragraphs.append(f'<p>{_sentence(rnd, markers)}</p>')
+                for _ in range(markers):
+                    specs.append(_random_spec(rnd, n))
+        corpus.append(('\n'.join(paragraphs), specs))
+    return corpus
+
+
+def _random_spec(rnd, n):
+    ref_type = rnd.choice(['website', 'website', 'pdf', 'video', 'tickeritem', 'abbreviation'])
+    if ref_type == 'abbreviation':
+        short, text = rnd.choice(ABBREVIATIONS)
+        return rendering.RefSpec(ref_type, None, short, None, text, True)
+    if ref_type == 'tickeritem':
+        href = f'/news/?date=2024-03-{rnd.randint(1, 28):02d}&days=0&show_all=on#ti-{n}'
+        return rendering.RefSpec(ref_type, href, None, f'News Ticker: {rnd.choice(WORDS)}, vom 2024-03-01', None, True)
+    href = f'https://example.org/{rnd.choice(WORDS).lower()}/{n}?utm_source=ticker&id={n}'
+    return rendering.RefSpec(ref_type, href, None, 'Externer Link', None, False)
@@ -0,0 +1,151 @@
+import datetime
+import random
+from collections import namedtuple
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .. import categories
+from .corpus import ABBREVIATIONS, WORDS, summary_corpus
+
+
+Dataset = namedtuple('Dataset', [
+    'seed', 'category_ids', 'item_ids', 'ref_count', 'sharelink_ids', 'click_count', 'ref_date', 'days',
+])
+
+USER_AGENTS = [
+    'Mozilla/5.0 (iPhone; CPU iPhone OS 17_4 like Mac OS X) AppleWebKit/605.1.15 Mobile/15E148',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/124.0 Safari/537.36',
+    'Mozilla/5.0 (X11; Linux x86_64; rv:125.0) Gecko/20100101 Firefox/125.0',
+]
+
+
+def _headline(rnd):
+    return ' '.join(rnd.choice(WORDS) for _ in range(rnd.randint(4, 9)))
+
+
+def _category_tree(rnd, depth, fanout):
+    # Benchmark root with fanout children per node down to depth levels, returns the leaf ids
+    from ..models import TickerCategory
+
+    level = [TickerCategory.add_root(name=f'Benchmark {rnd.randrange(10 ** 6)}')]
+    for d in range(depth):
+        level = [
+            parent.add_child(name=f'{rnd.choice(WORDS)} {d}.{n}')
+            for parent in level
+            for n in range(fanout)
+        ]
+    return [category.pk for category in level]
+
+
+def _ref(rnd, ref_type, item, index, link_targets):
+    from ..models import TickerRef
+
+    ref = TickerRef(item=item, ref_type=ref_type, index=index)
+    if ref_type == 'abbreviation':
+        ref.title, ref.text = rnd.choice(ABBREVIATIONS)
+    elif ref_type == 'tickeritem' and link_targets:
+        ref.linked_tickeritem_id = rnd.choice(link_targets)
+    else:
+        ref.ref_type = ref_type if ref_type != 'tickeritem' else 'website'
+        ref.url = f'https://example.org/{rnd.choice(WORDS).lower()}/{item.pk}-{index}'
+        if rnd.random() < 0.3:
+            ref.title = _headline(rnd)
+    return ref
+
+
+def generate(seed=0, items=2000, days=30, depth=2, fanout=4, publications=12, item_types=6,
+             extra_refs=1, sharelinks=100, clicks_per_link=20, ref_date=None, batch_size=500):
+    # Seeded synthetic ticker: category tree, publications, item types, items with marker-rich
+    # summaries, one ref per marker (incl. links to earlier items and abbreviations) plus extra refs
+    # outside the summary, persisted renderings, share links with click history.
+    # Same seed and parameters give the same data, apart from primary keys.
+    from ..models import (
+        ShareLink, ShareLinkClick, TickerItem, TickerItemType, TickerPublication, TickerRef, defer_summary_refresh,
+    )
+
+    rnd = random.Random(seed)
+    if ref_date is None:
+        ref_date = timezone.localdate()
+    end = timezone.make_aware(datetime.datetime.combine(ref_date, datetime.time(23, 0)))
+
+    leaf_ids = _category_tree(rnd, depth, fanout)
+    publication_ids = [p.pk for p in TickerPublication.objects.bulk_create([
+        TickerPublication(name=f'{rnd.choice(WORDS)} Zeitung {n}', url=f'https://example.org/p{n}')
+        for n in range(publications)
+    ])]
+    item_type_ids = [t.pk for t in TickerItemType.objects.bulk_create([
+        TickerItemType(name=f'Typ {n}', color=f'{rnd.randrange(16 ** 6):06x}') for n in range(item_types)
+    ])]
+
+    item_ids = []
+    ref_count = 0
+    span = days * 24 * 3600
+    with defer_summary_refresh():
+        for offset in range(0, items, batch_size):
+            size = min(batch_size, items - offset)
+            corpus = summary_corpus(size, seed=seed * 7919 + offset)
+            batch = TickerItem.objects.bulk_create([
+                TickerItem(
+                    category_id=rnd.choice(leaf_ids),
+                    publication_id=rnd.choice(publication_ids),
+                    item_type_id=rnd.choice(item_type_ids),
+                    pub_dt=end - datetime.timedelta(seconds=rnd.randrange(span)),
+                    headline=_headline(rnd),
+                    summary=summary,
+                    has_summary=len(summary) > len('<p></p>'),
+                )
+                for summary, specs in corpus
+            ])
+            refs = []
+            for item, (summary, specs) in zip(batch, corpus):
+                ref_types = [spec.ref_type for spec in specs]
+                ref_types += [rnd.choice(['website', 'pdf', 'video']) for _ in range(rnd.randint(0, extra_refs))]
+                refs += [_ref(rnd, ref_type, item, index, item_ids) for index, ref_type in enumerate(ref_types)]
+            TickerRef.objects.bulk_create(refs)
+            ref_count += len(refs)
+            item_ids += [item.pk for item in batch]
+            TickerItem.objects.refresh_items([item.pk for item in batch], batch_size=batch_size)
+
+    sharelink_ids = []
+    click_count = 0
+    for _ in range(sharelinks):
+        sharelink = ShareLink(
+            valid_until=end + datetime.timedelta(days=rnd.randint(-10, 60)),
+            display_date=ref_date - datetime.timedelta(days=rnd.randrange(max(1, days))),
+            display_days=rnd.randint(0, 3),
+        )
+        sharelink.save()
+        sharelink_ids.append(sharelink.pk)
+        clicks = [
+            ShareLinkClick(
+                sharelink=sharelink,
+                ts=end - datetime.timedelta(seconds=rnd.randrange(span)),
+                user_agent=rnd.choice(USER_AGENTS),
+            )
+            for _ in range(rnd.randint(0, 2 * clicks_per_link))
+        ]
+        ShareLinkClick.objects.bulk_create(clicks, batch_size=batch_size)
+        ShareLink.objects.filter(pk=sharelink.pk).update(clicks_counter=F('clicks_counter') + len(clicks))
+        click_count += len(clicks)
+
+    return Dataset(
+        seed=seed, category_ids=leaf_ids, item_ids=item_ids, ref_count=ref_count,
+        sharelink_ids=sharelink_ids, click_count=click_count, ref_date=ref_date, days=days,
+    )
+
+
+@contextmanager
+def generated(**params):
+    # generate() inside a transaction that is rolled back afterwards
+    try:
+        with transaction.atomic():
+            try:
+                yield generate(**params)
+            finally:
+                transaction.set_rollback(True)
+    finally:
+        # the cached tree still knows the rolled back categories
+        categories.invalidate_category_tree()
@@ -0,0 +1,59 @@
+import datetime
+import json
+import platform
+
+import django
+from django.db import connection
+
+
+def metadata(**params):
+    return {
+        'created': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+        'params': params,
+    }
+
+
+def dump(report, path):
+    data = json.dumps(report, indent=2, sort_keys=True, default=str)
+    if path == '-':
+        return data
+    with open(path, 'w') as f:
+        f.write(data + '\n')
+    return data
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(report, baseline, tolerance=0.25):
+    # Timings (keys ending in _s, lower is better) and query counts present in both reports,
+    # a metric regressed when it grew by more than tolerance (query counts: by any amount)
+    rows = []
+    for scenario, result in report['results'].items():
+        old_result = baseline.get('results', {}).get(scenario)
+        if not old_result:
+            continue
+        for metric, new in result.items():
+            old = old_result.get(metric)
+            if not isinstance(new, (int, float)) or not isinstance(old, (int, float)):
+                continue
+            if metric.endswith('_s'):
+                regressed = old > 0 and new > old * (1 + tolerance)
+            elif metric.endswith('queries'):
+                regressed = new > old
+            else:
+                continue
+            rows.append({
+                'scenario': scenario,
+                'metric': metric,
+                'baseline': old,
+                'current': new,
+                'ratio': new / old if old else None,
+                'regressed': regressed,
+            })
+    return rows
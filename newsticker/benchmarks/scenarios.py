@@ -0,0 +1,294 @@
+import datetime
+import random
+import time
+
+from django.db import transaction
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from .. import rendering, search
+from ..urlbuilder import OverviewUrlBuilder
+from .corpus import WORDS, summary_corpus
+
+
+def _timed(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def bench_render(count=1000, repeat=3, seed=0):
+    corpus = summary_corpus(count, seed=seed)
+
+    mismatches = 0
+    fallbacks = 0
+    for summary, specs in corpus:
+        try:
+            fast = rendering.render_fast(summary, specs)
+        except rendering.FastRenderUnsupported:
+            fallbacks += 1
+            continue
+        if fast != rendering.render_soup(summary, specs):
+            mismatches += 1
+
+    def run(renderer):
+        def inner():
+            for summary, specs in corpus:
+                renderer(summary, specs)
+        return inner
+
+    soup_time = _timed(run(rendering.render_soup), repeat)
+    fast_time = _timed(run(lambda summary, specs: rendering.render(summary, specs, engine='fast')), repeat)
+    return {
+        'summaries': count,
+        'soup_s': soup_time,
+        'fast_s': fast_time,
+        'speedup': soup_time / fast_time if fast_time else None,
+        'fallbacks': fallbacks,
+        'mismatches': mismatches,
+    }
+
+
+def bench_sharelink_create(count=100000, strategy='random'):
+    # Creates the links inside a transaction that is rolled back afterwards
+    from ..models import ShareLink
+
+    valid_until = timezone.now() + datetime.timedelta(days=30)
+    display_date = timezone.localdate()
+    with override_settings(NEWSTICKER_SHARELINK_SHORT_STRATEGY=strategy), transaction.atomic():
+        start = time.perf_counter()
+        for _ in range(count):
+            ShareLink(valid_until=valid_until, display_date=display_date).save()
+        elapsed = time.perf_counter() - start
+        transaction.set_rollback(True)
+    return {
+        'links': count,
+        'strategy': strategy,
+        'total_s': elapsed,
+        'per_link_us': elapsed / count * 1e6 if count else None,
+    }
+
+
+def bench_urls(count=1000, refs_per_item=3, repeat=3):
+    # In-memory items and linked refs, compares per-object URL methods with OverviewUrlBuilder
+    from ..models import TickerItem, TickerRef
+
+    now = timezone.now()
+    items = [TickerItem(pk=n + 1, pub_dt=now - datetime.timedelta(hours=n), category_id=1) for n in range(count)]
+    refs = [
+        [TickerRef(linked_tickeritem=items[(n + k + 1) % count]) for k in range(refs_per_item)]
+        for n in range(count)
+    ]
+
+    def per_object():
+        for item, item_refs in zip(items, refs):
+            item.get_overview_url(collape_cat=True)
+            for ref in item_refs:
+                ref.get_href()
+
+    def batch():
+        builder = OverviewUrlBuilder()
+        for item, item_refs in zip(items, refs):
+            builder.item_url(item, collape_cat=True)
+            for ref in item_refs:
+                builder.ref_href(ref)
+
+    per_object_time = _timed(per_object, repeat)
+    batch_time = _timed(batch, repeat)
+    return {
+        'items': count,
+        'refs': count * refs_per_item,
+        'per_object_s': per_object_time,
+        'batch_s': batch_time,
+        'speedup': per_object_time / batch_time if batch_time else None,
+    }
+
+
+def bench_search(count=500000, queries=20, seed=0, batch_size=5000):
+    # Synthetic items and search documents inside a transaction that is rolled back afterwards
+    from ..models import TickerCategory, TickerItem, TickerItemSearchDocument, TickerItemType, TickerPublication
+
+    rnd = random.Random(seed)
+    now = timezone.now()
+    with transaction.atomic():
+        category = TickerCategory.add_root(name='Benchmark')
+        publication = TickerPublication.objects.create(name='Benchmark')
+        item_type = TickerItemType.objects.create(name='Benchmark')
+
+        start = time.perf_counter()
+        done = 0
+        while done < count:
+            size = min(batch_size, count - done)
+            corpus = summary_corpus(size, seed=seed + done)
+            items = TickerItem.objects.bulk_create([
+                TickerItem(
+                    category=category, publication=publication, item_type=item_type,
+                    pub_dt=now - datetime.timedelta(minutes=done + n),
+                    # a selective term, each one is used by ~100 items
+                    headline=' '.join(rnd.choice(WORDS) for _ in range(6)) + f' Vorgang{rnd.randrange(max(1, count // 100))}x',
+                    summary=summary,
+                )
+                for n, (summary, specs) in enumerate(corpus)
+            ])
+            TickerItemSearchDocument.objects.bulk_create([
+                TickerItemSearchDocument(item=item, text=search.document_text(item, [])) for item in items
+            ])
+            done += size
+        setup_time = time.perf_counter() - start
+
+        terms = [f'{rnd.choice(WORDS)} Vorgang{rnd.randrange(max(1, count // 100))}x' for _ in range(queries)]
+        qs = TickerItem.objects.order_by('-pub_dt')
+
+        def run(search_filter):
+            def inner():
+                for term in terms:
+                    list(search_filter(qs, term).values_list('pk', flat=True)[:50])
+            return inner
+
+        index_time = _timed(run(search.search), 1)
+        legacy_time = _timed(run(search.legacy_filter), 1)
+        transaction.set_rollback(True)
+
+    return {
+        'items': count,
+        'queries': queries,
+        'backend': type(search.get_backend()).__name__,
+        'setup_s': setup_time,
+        'index_s': index_time,
+        'icontains_s': legacy_time,
+        'speedup': legacy_time / index_time if index_time else None,
+    }
+
+
+def _queries(func):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    with CaptureQueriesContext(connection) as captured:
+        func()
+    return len(captured.captured_queries)
+
+
+def bench_current_by_date(dataset, limit_days=3, repeat=3):
+    # Overview window incl. grouping, URLs and stored renderings, as the overview view does it
+    from ..models import TickerItem
+    from ..urlbuilder import OverviewUrlBuilder
+
+    items = 0
+
+    def run():
+        nonlocal items
+        by_date = TickerItem.objects.current_by_date(ref_date=dataset.ref_date, limit_days=limit_days)
+        OverviewUrlBuilder().build(by_date)
+        items = 0
+        for cats in by_date.values():
+            for cat_items in cats.values():
+                for item in cat_items:
+                    item.get_rendered_summary()
+                    items += 1
+
+    best = _timed(run, repeat)
+    return {
+        'days': limit_days,
+        'items': items,
+        'queries': _queries(run),
+        'window_s': best,
+        'per_item_us': best / items * 1e6 if items else None,
+    }
+
+
+def bench_rendered_summary(dataset, count=500, repeat=3):
+    # get_rendered_summary() from the stored rendering, with a share link (rendered on the fly)
+    # and the write path refresh_summary(force=True)
+    from ..models import ShareLink, TickerItem
+
+    ids = dataset.item_ids[-count:]
+    items = list(TickerItem.objects.with_relations(TickerItem.objects.filter(pk__in=ids)))
+    short_link = ShareLink.objects.filter(pk__in=dataset.sharelink_ids).first()
+
+    def stored():
+        for item in items:
+            item.short_link = None
+            item.get_rendered_summary()
+
+    def on_the_fly():
+        for item in items:
+            item.short_link = short_link
+            item.get_rendered_summary()
+
+    def refresh():
+        TickerItem.objects.refresh_summaries(items, force=True)
+
+    return {
+        'items': len(items),
+        'stored_s': _timed(stored, repeat),
+        'on_the_fly_s': _timed(on_the_fly, repeat),
+        'refresh_s': _timed(refresh, repeat),
+    }
+
+
+def bench_sharelink_clicks(dataset, count=1000):
+    # ShareLink.save() and add_request() on the generated links, direct (unbuffered) clicks
+    from django.contrib.auth.models import AnonymousUser
+    from django.test import RequestFactory
+
+    from ..models import ShareLink
+
+    links = list(ShareLink.objects.filter(pk__in=dataset.sharelink_ids))
+    request = RequestFactory().get('/', HTTP_USER_AGENT='benchmark')
+    request.user = AnonymousUser()
+
+    start = time.perf_counter()
+    for n in range(count):
+        ShareLink(valid_until=links[n % len(links)].valid_until, display_date=dataset.ref_date).save()
+    save_time = time.perf_counter() - start
+
+    with override_settings(NEWSTICKER_CLICKS_BUFFERED=False):
+        start = time.perf_counter()
+        for n in range(count):
+            links[n % len(links)].add_request(request)
+        click_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for n in range(count):
+        ShareLink.objects.resolve(links[n % len(links)].short)
+    resolve_time = time.perf_counter() - start
+
+    return {
+        'operations': count,
+        'save_s': save_time,
+        'add_request_s': click_time,
+        'resolve_s': resolve_time,
+    }
+
+
+def bench_admin_changelists(dataset, repeat=3):
+    # Renders the first changelist page of the ticker admins as a superuser
+    from django.contrib import admin
+    from django.contrib.auth import get_user_model
+    from django.test import RequestFactory
+
+    from ..models import ShareLink, TickerItem, TickerRef
+
+    user = get_user_model().objects.create_superuser('newsticker-benchmark', 'benchmark@example.org', None)
+    factory = RequestFactory()
+    result = {}
+    for model, params in ((TickerItem, {}), (TickerItem, {'q': WORDS[0]}), (TickerRef, {}), (ShareLink, {})):
+        model_admin = admin.site._registry[model]
+        request = factory.get('/', params)
+        request.user = user
+
+        def run():
+            model_admin.changelist_view(request).render()
+
+        name = model._meta.model_name + ('_search' if params else '')
+        # RequestFactory requests come from 'testserver', like in the test client
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            result[f'{name}_s'] = _timed(run, repeat)
+            result[f'{name}_queries'] = _queries(run)
+    return result
@@ -0,0 +1,6 @@
+from django.conf import settings
+from django.core.cache import caches
+
+
+def get_cache():
+    return caches[getattr(settings, 'NEWSTICKER_CACHE_ALIAS', 'default')]
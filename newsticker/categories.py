@@ -0,0 +1,133 @@
+import bisect
+import hashlib
+
+from django.conf import settings
+
+from . import caching
+
+
+TREE_CACHE_KEY = 'newsticker:category_tree'
+TREE_VERSION_CACHE_KEY = 'newsticker:category_tree:version'
+
+
+def get_tree_timeout():
+    # Bounds how long a process keeps a stale tree when invalidations don't reach it (per-process
+    # caches like LocMemCache), with a shared cache they take effect at once
+    return getattr(settings, 'NEWSTICKER_CATEGORY_TREE_TIMEOUT', 300)
+
+
+def rows_version(rows):
+    # derived from the rows, so reloading an unchanged tree after the timeout keeps the version
+    # (part of the day cache keys and window ETags)
+    return hashlib.sha1(repr(rows).encode()).hexdigest()
+
+
+class CategoryTree:
+    # In-memory copy of the TickerCategory tree: nodes by id and path, descendants and sort keys
+    def __init__(self, rows, version=None):
+        from .models import TickerCategory
+
+        self.version = version
+        self.nodes = {}
+        self.by_path = {}
+        for pk, path, depth, numchild, name in rows:
+            self.nodes[pk] = TickerCategory(pk=pk, path=path, depth=depth, numchild=numchild, name=name)
+            self.by_path[path] = pk
+        self.paths = sorted(self.by_path)
+
+    def get(self, pk):
+        return self.nodes.get(pk)
+
+    def sort_key(self, pk):
+        # treebeard orders siblings through the path, so the path is the overview order
+        return self.nodes[pk].path
+
+    def depth(self, pk):
+        return self.nodes[pk].depth
+
+    def descendant_ids(self, pk, include_self=True):
+        path = self.nodes[pk].path
+        start = bisect.bisect_left(self.paths, path)
+        ids = []
+        for other in self.paths[start:]:
+            if not other.startswith(path):
+                break
+            if other != path or include_self:
+                ids.append(self.by_path[other])
+        return ids
+
+    def ancestor_ids(self, pk):
+        node = self.nodes[pk]
+        steplen = node.steplen
+        return [self.by_path[node.path[:i]] for i in range(steplen, len(node.path), steplen)]
+
+    def expand_ids(self, ids):
+        # ids plus all their descendants, unknown ids are dropped
+        expanded = set()
+        for pk in ids:
+            if pk in self.nodes and pk not in expanded:
+                expanded.update(self.descendant_ids(pk))
+        return expanded
+
+
+_tree = None
+
+
+def load_rows():
+    from .models import TickerCategory
+
+    return list(TickerCategory.objects.order_by('path').values_list('pk', 'path', 'depth', 'numchild', 'name'))
+
+
+def get_category_tree():
+    # One cache lookup for the version per call, the tree itself is rebuilt only when the version changed
+    global _tree
+    cache = caching.get_cache()
+    version = cache.get(TREE_VERSION_CACHE_KEY)
+    tree = _tree
+    if tree is not None and version is not None and tree.version == version:
+        return tree
+
+    cached = cache.get(TREE_CACHE_KEY) if version is not None else None
+    if cached is not None and cached[0] == version:
+        rows = cached[1]
+    else:
+        rows = load_rows()
+        version = rows_version(rows)
+        cache.set_many({TREE_VERSION_CACHE_KEY: version, TREE_CACHE_KEY: (version, rows)}, get_tree_timeout())
+    tree = CategoryTree(rows, version=version)
+    _tree = tree
+    return tree
+
+
+async def aget_category_tree():
+    # get_category_tree() with the async cache and ORM APIs
+    from .models import TickerCategory
+
+    global _tree
+    cache = caching.get_cache()
+    version = await cache.aget(TREE_VERSION_CACHE_KEY)
+    tree = _tree
+    if tree is not None and version is not None and tree.version == version:
+        return tree
+
+    cached = await cache.aget(TREE_CACHE_KEY) if version is not None else None
+    if cached is not None and cached[0] == version:
+        rows = cached[1]
+    else:
+        rows = [
+            row async for row in
+            TickerCategory.objects.order_by('path').values_list('pk', 'path', 'depth', 'numchild', 'name')
+        ]
+        version = rows_version(rows)
+        await cache.aset_many({TREE_VERSION_CACHE_KEY: version, TREE_CACHE_KEY: (version, rows)}, get_tree_timeout())
+    tree = CategoryTree(rows, version=version)
+    _tree = tree
+    return tree
+
+
+def invalidate_category_tree():
+    global _tree
+    cache = caching.get_cache()
+    cache.delete_many([TREE_VERSION_CACHE_KEY, TREE_CACHE_KEY])
+    _tree = None
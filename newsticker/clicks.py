@@ -0,0 +1,123 @@
+import atexit
+import logging
+import os
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+
+from . import metrics
+
+
+logger = logging.getLogger(__name__)
+
+
+def is_buffered():
+    return getattr(settings, 'NEWSTICKER_CLICKS_BUFFERED', False)
+
+
+class BufferedClickRecorder:
+    # Collects ShareLinkClick instances in memory and writes them with one bulk_create and
+    # one counter UPDATE per share link, every flush_interval seconds or flush_size clicks.
+    # A failed flush keeps the clicks for the next one, at most max_buffer (the newest)
+    def __init__(self, flush_interval=5.0, flush_size=200, max_buffer=10000):
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self.max_buffer = max_buffer
+        self.lock = threading.Lock()
+        self.buffer = []
+        self.wakeup = threading.Event()
+        self.stopped = False
+        self.thread = None
+        self.pid = None
+
+    def record(self, click):
+        with self.lock:
+            self.buffer.append(click)
+            size = len(self.buffer)
+            self._ensure_thread()
+        if size >= self.flush_size:
+            self.wakeup.set()
+
+    def _ensure_thread(self):
+        # (re)start the flusher lazily, also in forked worker processes
+        if self.thread is not None and self.pid == os.getpid() and self.thread.is_alive():
+            return
+        self.pid = os.getpid()
+        self.stopped = False
+        self.thread = threading.Thread(target=self._run, name='newsticker-click-flusher', daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while not self.stopped:
+            self.wakeup.wait(self.flush_interval)
+            self.wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Flushing share link clicks failed')
+            finally:
+                connection.close()
+
+    def flush(self):
+        from .models import ShareLink, ShareLinkClick
+
+        with self.lock:
+            clicks, self.buffer = self.buffer, []
+        if not clicks:
+            return 0
+
+        counts = Counter(click.sharelink_id for click in clicks)
+        try:
+            with metrics.timer('sharelink.click_flush', clicks=len(clicks)), transaction.atomic():
+                ShareLinkClick.objects.bulk_create(clicks, batch_size=500)
+                for sharelink_id, count in counts.items():
+                    ShareLink.objects.filter(pk=sharelink_id).update(clicks_counter=F('clicks_counter') + count)
+        except Exception:
+            self._requeue(clicks)
+            raise
+        return len(clicks)
+
+    def _requeue(self, clicks):
+        for click in clicks:
+            # bulk_create may have set the primary keys of the rolled back rows
+            click.pk = None
+            click._state.adding = True
+        with self.lock:
+            self.buffer = clicks + self.buffer
+            dropped = len(self.buffer) - self.max_buffer
+            if dropped > 0:
+                del self.buffer[:dropped]
+        if dropped > 0:
+            metrics.count('sharelink.clicks_dropped', dropped)
+            logger.warning('Dropped %d buffered share link clicks', dropped)
+
+    def stop(self):
+        self.stopped = True
+        self.wakeup.set()
+        if self.thread is not None and self.pid == os.getpid() and self.thread.is_alive():
+            self.thread.join(timeout=self.flush_interval + 5)
+        try:
+            self.flush()
+        except Exception:
+            logger.exception('Flushing share link clicks failed')
+
+
+_recorder = None
+_recorder_lock = threading.Lock()
+
+
+def get_recorder():
+    global _recorder
+    if _recorder is None:
+        with _recorder_lock:
+            if _recorder is None:
+                _recorder = BufferedClickRecorder(
+                    flush_interval=getattr(settings, 'NEWSTICKER_CLICKS_FLUSH_INTERVAL', 5.0),
+                    flush_size=getattr(settings, 'NEWSTICKER_CLICKS_FLUSH_SIZE', 200),
+                    max_buffer=getattr(settings, 'NEWSTICKER_CLICKS_MAX_BUFFER', 10000),
+                )
+                atexit.register(_recorder.stop)
+    return _recorder
@@ -0,0 +1,58 @@
+from django.conf import settings
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from . import caching
+
+
+def get_page_cache_timeout():
+    # NEWSTICKER_WINDOW_CACHE_TIMEOUT: seconds to keep rendered overview pages, 0 disables the page cache
+    return getattr(settings, 'NEWSTICKER_WINDOW_CACHE_TIMEOUT', 0)
+
+
+def page_cache_key(fingerprint, variant=''):
+    return f'newsticker:window_page:{fingerprint.etag}:{variant}'
+
+
+def set_validators(response, fingerprint):
+    response['ETag'] = f'"{fingerprint.etag}"'
+    if fingerprint.last_modified is not None:
+        response['Last-Modified'] = http_date(fingerprint.last_modified.timestamp())
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+def window_response(request, render, variant='', **window_kwargs):
+    # Answers a GET for an overview window from its fingerprint: 304 when the client's ETag still
+    # matches, the cached page when one exists, otherwise render(fingerprint).
+    # window_kwargs are passed to TickerItemManager.window_fingerprint(), variant is mixed into the
+    # page cache key for anything else the page depends on (template, language, ...).
+    from .models import TickerItem
+
+    fingerprint = TickerItem.objects.window_fingerprint(**window_kwargs)
+    etag = f'"{fingerprint.etag}"'
+
+    if request.method in ('GET', 'HEAD'):
+        # only the ETag: Last-Modified doesn't move when items are deleted or leave the window,
+        # If-Modified-Since alone would get a 304 for a changed page
+        response = get_conditional_response(request, etag=etag)
+        if response is not None:
+            return set_validators(response, fingerprint)
+
+    # pages for logged in users can contain admin links, csrf tokens etc.
+    timeout = get_page_cache_timeout()
+    user = getattr(request, 'user', None)
+    use_cache = timeout and request.method in ('GET', 'HEAD') and not (user and user.is_authenticated)
+    cache = caching.get_cache()
+    key = page_cache_key(fingerprint, variant)
+    if use_cache:
+        response = cache.get(key)
+        if response is not None:
+            return set_validators(response, fingerprint)
+
+    response = render(fingerprint)
+    if use_cache and response.status_code == 200 and not getattr(response, 'streaming', False):
+        if hasattr(response, 'render') and callable(response.render):
+            response = response.render()
+        cache.set(key, response, timeout)
+    return set_validators(response, fingerprint)
@@ -0,0 +1,140 @@
+import datetime
+import hashlib
+
+from django.conf import settings
+from django.db.models import Count, Max
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from . import caching, categories, rendering
+
+
+def get_past_day_timeout():
+    return getattr(settings, 'NEWSTICKER_DAY_CACHE_TIMEOUT', 24 * 3600)
+
+
+def get_today_timeout():
+    # today changes through scheduled pub_dt passing, not only through saves
+    return getattr(settings, 'NEWSTICKER_DAY_CACHE_TODAY_TIMEOUT', 60)
+
+
+def get_version_timeout():
+    # Bounds how long a process serves a stale day when invalidate_days() doesn't reach it
+    # (per-process caches like LocMemCache), fragments outlive it only under an unchanged version
+    return getattr(settings, 'NEWSTICKER_DAY_CACHE_VERSION_TIMEOUT', 300)
+
+
+def local_date(dt):
+    return timezone.localtime(dt, timezone=timezone.get_current_timezone()).date()
+
+
+def version_key(date):
+    return f'newsticker:day:{date.isoformat()}:version'
+
+
+def day_stats(dates):
+    # (count, max pk, max modified_dt) of the items per local date, one aggregate query
+    from .models import TickerItem, local_day_start
+
+    stats = {d: (0, None, None) for d in dates}
+    qs = TickerItem.objects.filter(
+        pub_dt__gte=local_day_start(min(dates)),
+        pub_dt__lt=local_day_start(max(dates) + datetime.timedelta(days=1)),
+    )
+    rows = qs.annotate(day=TruncDate('pub_dt', tzinfo=timezone.get_current_timezone())).order_by().values('day').annotate(
+        count=Count('pk'), max_pk=Max('pk'), last_modified=Max('modified_dt'))
+    for row in rows:
+        if row['day'] in stats:
+            stats[row['day']] = (row['count'], row['max_pk'], row['last_modified'])
+    return stats
+
+
+def stats_version(date, stats):
+    # derived from the items like TickerItemManager.window_fingerprint(), so an expired token of an
+    # unchanged day comes back with the same version and its fragments stay valid
+    count, max_pk, last_modified = stats
+    key = (rendering.SUMMARY_RENDER_VERSION, date.isoformat(), count, max_pk, last_modified.isoformat() if last_modified else None)
+    return hashlib.sha1(repr(key).encode()).hexdigest()
+
+
+def get_versions(dates):
+    # One token per local date, deleted by invalidate_days(), missing tokens are computed from the items
+    cache = caching.get_cache()
+    keys = {version_key(d): d for d in dates}
+    found = cache.get_many(keys)
+    versions = {keys[key]: value for key, value in found.items()}
+    missing = [d for key, d in keys.items() if key not in found]
+    if missing:
+        stats = day_stats(missing)
+        computed = {d: stats_version(d, stats[d]) for d in missing}
+        cache.set_many({version_key(d): version for d, version in computed.items()}, get_version_timeout())
+        versions.update(computed)
+    return versions
+
+
+def invalidate_days(dates):
+    dates = set(dates)
+    if dates:
+        caching.get_cache().delete_many([version_key(d) for d in dates])
+
+
+def invalidate_items(items):
+    invalidate_days(local_date(item.pub_dt) for item in items if item.pub_dt)
+
+
+def category_key(limit_categories_qs=None, limit_category_ids=None):
+    if limit_category_ids is not None:
+        raw = ','.join(str(pk) for pk in sorted(limit_category_ids))
+    elif limit_categories_qs is not None:
+        raw = str(limit_categories_qs.query)
+    else:
+        raw = '*'
+    # names and order of the category headings come from the tree
+    raw += f':{categories.get_category_tree().version}'
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def fragment_key(date, version, cat_key, short_link=None, variant=''):
+    short = short_link.short if short_link else ''
+    return f'newsticker:day:{date.isoformat()}:{version}:{cat_key}:{short}:{variant}'
+
+
+def window_dates(ref_date, limit_days):
+    return [ref_date - datetime.timedelta(days=offset) for offset in range(limit_days + 1)]
+
+
+def render_window(render_day, ref_date=None, limit_days=3, limit_categories_qs=None, limit_category_ids=None,
+                  short_link=None, variant=''):
+    # Per day fragments of a current_by_date() window, newest day first. render_day(date, categories)
+    # gets the OrderedDict category -> items of one day and returns the fragment, only days not in
+    # the cache are queried and rendered. Days without items map to ''.
+    from .models import TickerItem
+
+    if ref_date is None:
+        ref_date = timezone.now().date()
+    today = timezone.localdate()
+    dates = window_dates(ref_date, limit_days)
+    cat_key = category_key(limit_categories_qs, limit_category_ids)
+    versions = get_versions(dates)
+    keys = {d: fragment_key(d, versions[d], cat_key, short_link, variant) for d in dates}
+
+    cache = caching.get_cache()
+    found = cache.get_many(keys.values())
+    fragments = {d: found[key] for d, key in keys.items() if key in found}
+    missing = [d for d in dates if d not in fragments]
+    if missing:
+        by_date = TickerItem.objects.current_by_date(
+            ref_date=max(missing), limit_days=(max(missing) - min(missing)).days,
+            limit_categories_qs=limit_categories_qs, limit_category_ids=limit_category_ids,
+            short_link=short_link,
+        )
+        past, current = {}, {}
+        for d in missing:
+            cats = by_date.get(d)
+            fragments[d] = render_day(d, cats) if cats else ''
+            (current if d >= today else past)[keys[d]] = fragments[d]
+        if past:
+            cache.set_many(past, get_past_day_timeout())
+        if current:
+            cache.set_many(current, get_today_timeout())
+    return [(d, fragments[d]) for d in dates]
@@ -0,0 +1,106 @@
+import datetime
+from collections import OrderedDict
+
+from django.db import transaction
+
+from .daycache import local_date
+
+
+def day_range(start, end):
+    from .models import local_day_start
+
+    return local_day_start(start), local_day_start(end + datetime.timedelta(days=1))
+
+
+def build_rows(start, end, category_ids=None):
+    # TickerDayDigest rows (unsaved) for the local dates start..end from the items, one query
+    from .models import TickerDayDigest, TickerItem
+
+    range_start, range_end = day_range(start, end)
+    qs = TickerItem.objects.filter(pub_dt__gte=range_start, pub_dt__lt=range_end)
+    if category_ids is not None:
+        qs = qs.filter(category_id__in=category_ids)
+    rows = OrderedDict()
+    for pk, pub_dt, category_id, modified_dt in qs.order_by('pub_dt', 'pk').values_list(
+            'pk', 'pub_dt', 'category_id', 'modified_dt').iterator(chunk_size=2000):
+        key = (local_date(pub_dt), category_id)
+        row = rows.get(key)
+        if row is None:
+            row = rows[key] = TickerDayDigest(date=key[0], category_id=category_id, item_ids=[], last_modified=modified_dt)
+        row.item_ids.append(pk)
+        if modified_dt and (row.last_modified is None or modified_dt > row.last_modified):
+            row.last_modified = modified_dt
+    for row in rows.values():
+        row.item_count = len(row.item_ids)
+    return rows
+
+
+def write_rows(rows, start, end, category_ids=None, batch_size=500):
+    # Upserts rows and removes the digests of start..end (and category_ids) that have no items anymore
+    from .models import TickerDayDigest
+
+    with transaction.atomic():
+        if rows:
+            TickerDayDigest.objects.bulk_create(
+                list(rows.values()),
+                batch_size=batch_size,
+                update_conflicts=True,
+                unique_fields=['date', 'category'],
+                update_fields=['item_ids', 'item_count', 'last_modified'],
+            )
+        stale = TickerDayDigest.objects.filter(date__range=(start, end))
+        if category_ids is not None:
+            stale = stale.filter(category_id__in=category_ids)
+        stale_pks = [
+            pk for pk, date, category_id in stale.values_list('pk', 'date', 'category_id')
+            if (date, category_id) not in rows
+        ]
+        if stale_pks:
+            TickerDayDigest.objects.filter(pk__in=stale_pks).delete()
+
+
+def lock_categories(category_ids=None):
+    # Serializes the digest refreshes of a category: the items are read only once the previous
+    # refresh committed, so two saves into the same day can't write digests missing each other's
+    # item. FOR NO KEY UPDATE doesn't block inserting items of the category.
+    from .models import TickerCategory
+
+    qs = TickerCategory.objects.select_for_update(no_key=True).order_by('pk')
+    if category_ids is not None:
+        qs = qs.filter(pk__in=category_ids)
+    list(qs.values_list('pk', flat=True))
+
+
+def refresh_keys(keys):
+    # Recomputes the digests of (local date, category id) pairs, one read per date
+    by_date = {}
+    for date, category_id in keys:
+        by_date.setdefault(date, set()).add(category_id)
+    if not by_date:
+        return
+    with transaction.atomic():
+        lock_categories(set().union(*by_date.values()))
+        for date, category_ids in by_date.items():
+            write_rows(build_rows(date, date, category_ids), date, date, category_ids)
+
+
+def item_key(item):
+    return local_date(item.pub_dt), item.category_id
+
+
+def refresh_items(items):
+    refresh_keys({item_key(item) for item in items if item.pub_dt and item.category_id})
+
+
+def rebuild(start, end, days_per_chunk=31):
+    # Rebuilds the digests of start..end, a chunk of days per transaction
+    written = 0
+    while start <= end:
+        chunk_end = min(end, start + datetime.timedelta(days=days_per_chunk - 1))
+        with transaction.atomic():
+            lock_categories()
+            rows = build_rows(start, chunk_end)
+            write_rows(rows, start, chunk_end)
+        written += len(rows)
+        start = chunk_end + datetime.timedelta(days=1)
+    return written
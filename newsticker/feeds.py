@@ -0,0 +1,179 @@
+import datetime
+import hashlib
+import json
+from io import StringIO
+
+from django.conf import settings
+from django.db.models import Q
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from django.utils.feedgenerator import rfc2822_date
+from django.utils.xmlutils import SimplerXMLGenerator
+
+from . import rendering
+from .urlbuilder import OverviewUrlBuilder
+
+
+def visible_dt():
+    # When an item showed up in the feed: created (backdated items, e.g. agency items with the wire
+    # timestamp) or published (scheduled items), whichever is later. The cursor follows this, so
+    # neither kind ends up behind a cursor a client already has. Same expression as the
+    # newsticker_ti_visible_dt_idx index.
+    return Greatest('created_dt', 'pub_dt')
+
+
+def get_default_limit():
+    return getattr(settings, 'NEWSTICKER_FEED_LIMIT', 100)
+
+
+def get_max_limit():
+    return getattr(settings, 'NEWSTICKER_FEED_MAX_LIMIT', 500)
+
+
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+MICROSECOND = datetime.timedelta(microseconds=1)
+
+
+def encode_cursor(dt, pk):
+    # microseconds since the epoch and pk, opaque for clients
+    if timezone.is_naive(dt):
+        dt = timezone.make_aware(dt)
+    return f'{(dt - EPOCH) // MICROSECOND}-{pk}'
+
+
+def decode_cursor(cursor):
+    # raises ValueError for malformed cursors
+    ts, _, pk = cursor.partition('-')
+    dt = EPOCH + int(ts) * MICROSECOND
+    if not settings.USE_TZ:
+        dt = timezone.make_naive(dt)
+    return dt, int(pk)
+
+
+def feed_queryset(since=None, limit_category_ids=None):
+    # Published items after the cursor in cursor order (visible_dt, pk), without relations
+    # (see with_relations())
+    from .models import TickerItem
+
+    qs = TickerItem.objects.filter(pub_dt__lte=timezone.now()).annotate(visible_dt=visible_dt())
+    if limit_category_ids is not None:
+        qs = qs.filter(category_id__in=limit_category_ids)
+    if since:
+        dt, pk = since
+        # >= as the range the index can seek to, the rest of the keyset condition as a filter
+        qs = qs.filter(visible_dt__gte=dt).exclude(Q(visible_dt=dt, pk__lte=pk))
+    return qs.order_by('visible_dt', 'pk')
+
+
+def latest_queryset(limit_category_ids=None):
+    # Newest published items first, for RSS readers which don't send cursors
+    from .models import TickerItem
+
+    qs = TickerItem.objects.filter(pub_dt__lte=timezone.now())
+    if limit_category_ids is not None:
+        qs = qs.filter(category_id__in=limit_category_ids)
+    return qs.order_by('-pub_dt', '-pk')
+
+
+def fingerprint(qs, limit, params):
+    # ETag and Last-Modified of a response over the first limit items of qs: pks and modified_dt
+    # of those rows only, read from the ordering index instead of aggregating the whole table
+    rows = list(qs.values_list('pk', 'modified_dt')[:limit + 1])
+    key = (rendering.SUMMARY_RENDER_VERSION, limit, sorted(params.items()), rows)
+    last_modified = max((modified_dt for pk, modified_dt in rows if modified_dt), default=None)
+    return hashlib.sha1(repr(key).encode()).hexdigest(), last_modified
+
+
+def serialize_item(item, url_builder, absolute_uri=None):
+    absolute_uri = absolute_uri or (lambda url: url)
+    refs = []
+    for ref in item.tickerref_set.all():
+        href = url_builder.ref_href(ref)
+        refs.append({
+            'index': ref.index,
+            'type': ref.ref_type,
+            'title': ref.get_ref_title(),
+            'text': ref.text,
+            'href': absolute_uri(href) if href else None,
+            'in_summary': ref.is_in_summary,
+            'linked_item': ref.linked_tickeritem_id,
+        })
+    return {
+        'id': item.pk,
+        'external_id': item.external_id,
+        'headline': item.headline,
+        'pub_dt': item.pub_dt.isoformat(),
+        'created_dt': item.created_dt.isoformat(),
+        'modified_dt': item.modified_dt.isoformat(),
+        'url': absolute_uri(url_builder.item_url(item)),
+        'category': {'id': item.category_id, 'name': item.category.name},
+        'publication': {'id': item.publication_id, 'name': item.publication.name, 'url': item.publication.url},
+        'item_type': {'id': item.item_type_id, 'name': item.item_type.name},
+        'summary_html': item.get_rendered_summary() if item.has_summary else '',
+        'refs': refs,
+    }
+
+
+def _limited(qs, limit, chunk_size=100):
+    # Yields (item, next cursor or None), the cursor is set on the last item when more items follow
+    previous = None
+    for n, item in enumerate(qs[:limit + 1].iterator(chunk_size=chunk_size)):
+        if n == limit:
+            yield previous, encode_cursor(previous.visible_dt, previous.pk)
+            return
+        if previous is not None:
+            yield previous, None
+        previous = item
+    if previous is not None:
+        yield previous, None
+
+
+def iter_json(qs, limit, since_cursor=None, absolute_uri=None):
+    # {"items": [...], "next_cursor": "...", "more": bool} over a feed_queryset(), written item by
+    # item. next_cursor is the cursor to poll with next time, the one of the request if nothing new
+    # arrived.
+    url_builder = OverviewUrlBuilder()
+    yield '{"items": ['
+    next_cursor = since_cursor
+    more = False
+    for n, (item, cursor) in enumerate(_limited(qs, limit)):
+        yield (', ' if n else '') + json.dumps(serialize_item(item, url_builder, absolute_uri), ensure_ascii=False)
+        next_cursor = cursor or encode_cursor(item.visible_dt, item.pk)
+        more = cursor is not None
+    yield f'], "next_cursor": {json.dumps(next_cursor)}, "more": {json.dumps(more)}}}\n'
+
+
+class _Buffer(StringIO):
+    def take(self):
+        data = self.getvalue()
+        self.seek(0)
+        self.truncate()
+        return data
+
+
+def iter_rss(items, title, link, description, absolute_uri=None):
+    # RSS 2.0, one chunk per item
+    absolute_uri = absolute_uri or (lambda url: url)
+    url_builder = OverviewUrlBuilder()
+    out = _Buffer()
+    xml = SimplerXMLGenerator(out, 'utf-8')
+    xml.startDocument()
+    xml.startElement('rss', {'version': '2.0'})
+    xml.startElement('channel', {})
+    xml.addQuickElement('title', title)
+    xml.addQuickElement('link', link)
+    xml.addQuickElement('description', description)
+    yield out.take()
+    for item in items:
+        xml.startElement('item', {})
+        xml.addQuickElement('title', item.headline)
+        xml.addQuickElement('link', absolute_uri(url_builder.item_url(item)))
+        xml.addQuickElement('guid', item.external_id or f'newsticker-item-{item.pk}', {'isPermaLink': 'false'})
+        xml.addQuickElement('pubDate', rfc2822_date(item.pub_dt))
+        xml.addQuickElement('category', item.category.name)
+        xml.addQuickElement('description', item.get_rendered_summary() if item.has_summary else '')
+        xml.endElement('item')
+        yield out.take()
+    xml.endElement('channel')
+    xml.endElement('rss')
+    yield out.take()
@@ -0,0 +1,171 @@
+import hashlib
+import json
+import logging
+import posixpath
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import F
+
+
+logger = logging.getLogger(__name__)
+
+# newsticker/cas/<2 hex>/<2 hex>/<sha256><extension>, the name never changes for a content,
+# so URLs below this prefix can be served with far future cache headers
+CAS_PREFIX = 'newsticker/cas'
+CHUNK_SIZE = 64 * 1024
+
+
+def is_enabled():
+    return getattr(settings, 'NEWSTICKER_CONTENT_ADDRESSED_UPLOADS', True)
+
+
+def is_content_addressed(name):
+    return bool(name) and name.startswith(CAS_PREFIX + '/')
+
+
+def hash_file(f, chunk_size=CHUNK_SIZE):
+    # sha256 and size, read in chunks
+    h = hashlib.sha256()
+    size = 0
+    if hasattr(f, 'seek'):
+        f.seek(0)
+    for chunk in iter(lambda: f.read(chunk_size), b''):
+        h.update(chunk)
+        size += len(chunk)
+    if hasattr(f, 'seek'):
+        f.seek(0)
+    return h.hexdigest(), size
+
+
+def content_name(digest, original_name):
+    extension = posixpath.splitext(original_name or '')[1].lower()[:16]
+    return f'{CAS_PREFIX}/{digest[:2]}/{digest[2:4]}/{digest}{extension}'
+
+
+def store(f, original_name):
+    # Stores the content of f once under its content name and returns the name, the reference
+    # count is not changed (see acquire()/release())
+    from .models import StoredFile
+
+    digest, size = hash_file(f)
+    name = content_name(digest, original_name)
+    StoredFile.objects.get_or_create(name=name, defaults={
+        'sha256': digest,
+        'size': size,
+        'original_name': posixpath.basename(original_name or '')[:255],
+    })
+    if not default_storage.exists(name):
+        f.seek(0)
+        saved = default_storage.save(name, f)
+        if saved != name:
+            # written concurrently under the same name, keep that one
+            default_storage.delete(saved)
+    return name
+
+
+def adopt(fieldfile, loaded_name=None):
+    # Content name for a TickerRef.uploadfile about to be saved: new uploads are stored directly,
+    # files FieldFile.save() already wrote below upload_to are moved
+    if not fieldfile._committed:
+        return store(fieldfile.file, fieldfile.name)
+    name = fieldfile.name
+    if name == loaded_name or is_content_addressed(name) or not default_storage.exists(name):
+        return name
+    with default_storage.open(name, 'rb') as f:
+        content_name = store(f, name)
+    # other refs (or archived ones) may still use the old file, it stays until
+    # newsticker_dedupe_files moves them
+    transaction.on_commit(lambda: delete_unused([name]))
+    return content_name
+
+
+def still_used(names):
+    # The names of upload_to files TickerRefs or archived items still refer to
+    from .models import TickerItemArchive, TickerRef
+
+    used = set(TickerRef.objects.filter(uploadfile__in=names).values_list('uploadfile', flat=True))
+    for name in set(names) - used:
+        # matched on the stored JSON, a false positive only keeps the file
+        if TickerItemArchive.objects.filter(data__icontains=json.dumps(name)[1:-1]).exists():
+            used.add(name)
+    return used
+
+
+def delete_unused(names):
+    # Deletes the upload_to files of names nothing refers to anymore, returns (files, bytes)
+    removed = removed_bytes = 0
+    for name in set(names) - still_used(names):
+        try:
+            if not default_storage.exists(name):
+                continue
+            removed_bytes += default_storage.size(name)
+            default_storage.delete(name)
+            removed += 1
+        except OSError:
+            logger.exception('Deleting %s failed', name)
+    return removed, removed_bytes
+
+
+def acquire(name, count=1):
+    from .models import StoredFile
+
+    if is_content_addressed(name):
+        StoredFile.objects.filter(name=name).update(refcount=F('refcount') + count)
+
+
+def release(name, count=1):
+    # Drops references, the file goes once nothing refers to it anymore
+    from .models import StoredFile
+
+    if not is_content_addressed(name):
+        return
+    StoredFile.objects.filter(name=name).update(refcount=F('refcount') - count)
+    deleted, _ = StoredFile.objects.filter(name=name, refcount__lte=0).delete()
+    if deleted:
+        transaction.on_commit(lambda: _delete_file(name))
+
+
+def _delete_file(name):
+    from .models import StoredFile
+
+    # re-uploaded in the meantime
+    if StoredFile.objects.filter(name=name).exists():
+        return
+    try:
+        default_storage.delete(name)
+    except OSError:
+        logger.exception('Deleting %s failed', name)
+
+
+def ref_deleted(sender, instance, **kwargs):
+    # post_delete of TickerRef, also runs for refs deleted through a cascade
+    if instance.uploadfile:
+        release(instance.uploadfile.name)
+
+
+def recount():
+    # Recomputes all reference counts from TickerRef and TickerItemArchive, returns the names
+    # without references (which are left in place)
+    from collections import Counter
+
+    from .models import StoredFile, TickerItemArchive, TickerRef
+
+    counts = Counter()
+    for name in TickerRef.objects.filter(uploadfile__startswith=CAS_PREFIX + '/').values_list('uploadfile', flat=True).iterator():
+        counts[name] += 1
+    for data in TickerItemArchive.objects.values_list('data', flat=True).iterator():
+        for ref in data.get('refs', []):
+            if is_content_addressed(ref.get('uploadfile')):
+                counts[ref['uploadfile']] += 1
+
+    unreferenced = []
+    with transaction.atomic():
+        for stored in StoredFile.objects.select_for_update().iterator():
+            refcount = counts.get(stored.name, 0)
+            if stored.refcount != refcount:
+                StoredFile.objects.filter(pk=stored.pk).update(refcount=refcount)
+            if not refcount:
+                unreferenced.append(stored.name)
+    return unreferenced
@@ -0,0 +1,240 @@
+import itertools
+import json
+from collections import namedtuple
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import categories
+
+
+# at most this many error messages are kept, the count covers all
+MAX_ERRORS = 100
+
+REF_TYPES = {'website', 'pdf', 'video', 'image', 'tickeritem', 'abbreviation'}
+
+
+class IngestError(ValueError):
+    pass
+
+
+class IngestResult:
+    def __init__(self):
+        self.created = 0
+        self.skipped = 0
+        self.refs = 0
+        self.failed = 0
+        self.errors = []
+
+    def error(self, lineno, message):
+        self.failed += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append((lineno, message))
+
+
+# one parsed input line, refs are unsaved TickerRef instances with item unset
+Record = namedtuple('Record', ['lineno', 'item', 'refs', 'linked_external_ids'])
+
+
+def read_jsonl(lines):
+    # Yields (line number, dict) pairs, blank lines are skipped
+    for lineno, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError as e:
+            yield lineno, IngestError(f'invalid JSON: {e}')
+            continue
+        yield lineno, data
+
+
+class Lookups:
+    # category, publication and item type by pk or name, loaded once per ingest run
+    def __init__(self):
+        from .models import TickerItemType, TickerPublication
+
+        self.tree = categories.get_category_tree()
+        self.categories = self.by_name((pk, node.name) for pk, node in self.tree.nodes.items())
+        self.publications = self.by_name(TickerPublication.objects.values_list('pk', 'name'))
+        self.item_types = self.by_name(TickerItemType.objects.values_list('pk', 'name'))
+
+    @staticmethod
+    def by_name(rows):
+        pks, names = set(), {}
+        for pk, name in rows:
+            pks.add(pk)
+            names.setdefault(name, []).append(pk)
+        return pks, names
+
+    @staticmethod
+    def resolve(value, table, label):
+        pks, names = table
+        if isinstance(value, int) and not isinstance(value, bool):
+            if value in pks:
+                return value
+        elif isinstance(value, str):
+            matches = names.get(value, [])
+            if len(matches) == 1:
+                return matches[0]
+            if len(matches) > 1:
+                raise IngestError(f'{label} {value!r} is ambiguous, use the id')
+        raise IngestError(f'unknown {label} {value!r}')
+
+
+def get_int(data, key, default=None):
+    value = data.get(key)
+    if value is None:
+        return default
+    if not isinstance(value, int) or isinstance(value, bool):
+        raise IngestError(f'{key} has to be an integer, got {value!r}')
+    return value
+
+
+def get_text(data, key, model=None):
+    # None for missing or empty values, the field's max_length is checked when model is given
+    value = data.get(key) or None
+    if value is None:
+        return None
+    if not isinstance(value, str):
+        raise IngestError(f'{key} has to be a string, got {value!r}')
+    max_length = model._meta.get_field(key).max_length if model else None
+    if max_length and len(value) > max_length:
+        raise IngestError(f'{key} is longer than {max_length} characters')
+    return value
+
+
+def parse_record(lineno, data, lookups):
+    from .models import TickerItem, TickerRef
+
+    if not isinstance(data, dict):
+        raise IngestError('expected a JSON object')
+    external_id = get_text(data, 'external_id', TickerItem)
+    if not external_id:
+        raise IngestError('external_id is required')
+    headline = get_text(data, 'headline', TickerItem)
+    if not headline:
+        raise IngestError('headline is required')
+
+    pub_dt = timezone.now()
+    if data.get('pub_dt'):
+        value = get_text(data, 'pub_dt')
+        try:
+            pub_dt = parse_datetime(value)
+        except ValueError:
+            # well formatted but out of range
+            pub_dt = None
+        if pub_dt is None:
+            raise IngestError(f'invalid pub_dt {value!r}')
+        if timezone.is_naive(pub_dt):
+            pub_dt = timezone.make_aware(pub_dt)
+
+    summary = get_text(data, 'summary')
+    item = TickerItem(
+        external_id=external_id,
+        category_id=lookups.resolve(data.get('category'), lookups.categories, 'category'),
+        publication_id=lookups.resolve(data.get('publication'), lookups.publications, 'publication'),
+        item_type_id=lookups.resolve(data.get('item_type'), lookups.item_types, 'item type'),
+        pub_dt=pub_dt,
+        headline=headline,
+        summary=summary,
+        # same rule as TickerItem.save()
+        has_summary=bool(summary) and len(summary) > len('<p></p>'),
+    )
+
+    refs = []
+    linked_external_ids = []
+    for index, ref_data in enumerate(data.get('refs') or []):
+        if not isinstance(ref_data, dict):
+            raise IngestError('refs have to be JSON objects')
+        ref_type = ref_data.get('ref_type')
+        if ref_type not in REF_TYPES:
+            raise IngestError(f'unknown ref_type {ref_type!r}')
+        ref = TickerRef(
+            ref_type=ref_type,
+            # refs are numbered in input order unless the feed has its own index
+            index=get_int(ref_data, 'index', index),
+            url=get_text(ref_data, 'url', TickerRef),
+            title=get_text(ref_data, 'title', TickerRef),
+            text=get_text(ref_data, 'text', TickerRef),
+            linked_tickeritem_id=get_int(ref_data, 'linked_tickeritem'),
+        )
+        refs.append(ref)
+        linked_external_ids.append(get_text(ref_data, 'linked_external_id'))
+    return Record(lineno, item, refs, linked_external_ids)
+
+
+def ingest(lines, batch_size=500, result=None):
+    # Imports JSON Lines (see parse_record for the fields) in chunks of batch_size items, one
+    # transaction each. Items whose external_id exists already are skipped. Lines that fail are
+    # reported in the result and don't stop the import.
+    from .models import TickerItem, TickerRef, defer_summary_refresh
+
+    if result is None:
+        result = IngestResult()
+    lookups = Lookups()
+    records = read_jsonl(lines)
+    while True:
+        chunk = list(itertools.islice(records, batch_size))
+        if not chunk:
+            break
+
+        parsed = {}
+        for lineno, data in chunk:
+            try:
+                if isinstance(data, Exception):
+                    raise data
+                record = parse_record(lineno, data, lookups)
+            except (IngestError, ValueError, TypeError) as e:
+                result.error(lineno, str(e))
+                continue
+            if record.item.external_id in parsed:
+                result.skipped += 1
+                continue
+            parsed[record.item.external_id] = record
+
+        existing = set(TickerItem.objects.filter(external_id__in=parsed).values_list('external_id', flat=True))
+        result.skipped += len(existing)
+        records_to_create = [record for external_id, record in parsed.items() if external_id not in existing]
+        if not records_to_create:
+            continue
+
+        with transaction.atomic(), defer_summary_refresh():
+            items = TickerItem.objects.bulk_create([record.item for record in records_to_create], batch_size=batch_size)
+            linked, linked_pks = resolve_linked(records_to_create)
+            refs = []
+            for record, item in zip(records_to_create, items):
+                for ref, linked_external_id in zip(record.refs, record.linked_external_ids):
+                    ref.item = item
+                    if linked_external_id:
+                        ref.linked_tickeritem_id = linked.get(linked_external_id)
+                    elif ref.linked_tickeritem_id not in linked_pks:
+                        ref.linked_tickeritem_id = None
+                    refs.append(ref)
+            TickerRef.objects.bulk_create(refs, batch_size=batch_size)
+            # rendered summary, is_in_summary, refs_in_summary_count and search documents,
+            # a fixed number of bulk statements per chunk
+            TickerItem.objects.refresh_items([item.pk for item in items], batch_size=batch_size)
+        result.created += len(items)
+        result.refs += len(refs)
+    return result
+
+
+def resolve_linked(records):
+    # Link targets: external id -> pk (from this chunk or earlier imports) and the existing
+    # ones of the pks given directly, unknown targets end up as refs without link
+    from .models import TickerItem
+
+    wanted = {external_id for record in records for external_id in record.linked_external_ids if external_id}
+    linked = {record.item.external_id: record.item.pk for record in records if record.item.external_id in wanted}
+    missing = wanted - set(linked)
+    if missing:
+        linked.update(TickerItem.objects.filter(external_id__in=missing).values_list('external_id', 'pk'))
+
+    pks = {ref.linked_tickeritem_id for record in records for ref in record.refs if ref.linked_tickeritem_id}
+    linked_pks = {None}
+    if pks:
+        linked_pks.update(TickerItem.objects.filter(pk__in=pks).values_list('pk', flat=True))
+    return linked, linked_pks
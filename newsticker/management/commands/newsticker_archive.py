@@ -0,0 +1,48 @@
+import datetime
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from newsticker import archive
+
+
+class Command(BaseCommand):
+    help = 'Move old ticker items (with refs and uploads) to TickerItemArchive and purge expired share links'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-days', type=int, default=None,
+                            help='Archive items published before this many days ago (default: NEWSTICKER_ARCHIVE_AFTER_DAYS)')
+        parser.add_argument('--sharelink-grace-days', type=int, default=None,
+                            help='Purge share links expired this many days ago (default: NEWSTICKER_SHARELINK_PURGE_AFTER_DAYS)')
+        parser.add_argument('--chunk-size', type=int, default=500)
+        parser.add_argument('--keep-files', action='store_true', help="Don't move uploads to the archive directory")
+        parser.add_argument('--skip-sharelinks', action='store_true')
+        parser.add_argument('--dry-run', action='store_true', help='Only count')
+
+    def handle(self, *args, **options):
+        older_than = options['older_than_days']
+        if older_than is None:
+            older_than = archive.get_archive_after_days()
+        if older_than < 1:
+            raise CommandError('--older-than-days must be at least 1')
+        cutoff = timezone.now() - datetime.timedelta(days=older_than)
+
+        start = time.perf_counter()
+        items, refs, files, protected = archive.archive_items(
+            cutoff, chunk_size=options['chunk_size'], move_uploads=not options['keep_files'], dry_run=options['dry_run']
+        )
+        verb = 'would be archived' if options['dry_run'] else 'archived'
+        self.stdout.write(self.style.SUCCESS(
+            f'{items} items {verb} (published before {cutoff:%Y-%m-%d}), {refs} refs, {files} files, '
+            f'{protected} kept as link targets, {time.perf_counter() - start:.1f}s'
+        ))
+
+        if not options['skip_sharelinks']:
+            grace = options['sharelink_grace_days']
+            if grace is None:
+                grace = archive.get_sharelink_grace_days()
+            expired_before = timezone.now() - datetime.timedelta(days=grace)
+            purged = archive.purge_sharelinks(expired_before, chunk_size=options['chunk_size'], dry_run=options['dry_run'])
+            verb = 'would be purged' if options['dry_run'] else 'purged'
+            self.stdout.write(self.style.SUCCESS(f'{purged} share links expired before {expired_before:%Y-%m-%d} {verb}'))
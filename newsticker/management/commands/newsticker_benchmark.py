@@ -0,0 +1,62 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from newsticker import benchmarks
+
+
+class Command(BaseCommand):
+    help = 'Run newsticker micro benchmarks, optionally compared against a stored JSON baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('scenarios', nargs='+', choices=benchmarks.SCENARIOS + ['all'])
+        parser.add_argument('--count', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--strategy', choices=['random', 'pk'], default='random', help='ShareLink short code strategy')
+        parser.add_argument('--items', type=int, default=2000, help='Generated items for dataset scenarios')
+        parser.add_argument('--days', type=int, default=30, help='Days the generated items are spread over')
+        parser.add_argument('--depth', type=int, default=2, help='Depth of the generated category tree')
+        parser.add_argument('--sharelinks', type=int, default=100)
+        parser.add_argument('--json', metavar='PATH', help='Write the results as JSON, - for stdout')
+        parser.add_argument('--baseline', metavar='PATH', help='Compare against the JSON of an earlier run')
+        parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed slowdown against the baseline')
+
+    def handle(self, *args, **options):
+        scenarios = benchmarks.SCENARIOS if 'all' in options['scenarios'] else options['scenarios']
+        dataset_params = {
+            'seed': options['seed'],
+            'items': options['items'],
+            'days': options['days'],
+            'depth': options['depth'],
+            'sharelinks': options['sharelinks'],
+        }
+        report = benchmarks.run(
+            scenarios, dataset_params=dataset_params,
+            count=options['count'], repeat=options['repeat'], seed=options['seed'], strategy=options['strategy'],
+        )
+
+        if options['json'] == '-':
+            self.stdout.write(benchmarks.dump(report, '-'))
+        else:
+            if 'dataset' in report:
+                self.stdout.write(', '.join(f'{value} {key}' for key, value in report['dataset'].items()))
+            for name, result in report['results'].items():
+                self.stdout.write(f'{name}: ' + ', '.join(self.format_value(key, value) for key, value in result.items()))
+            if options['json']:
+                benchmarks.dump(report, options['json'])
+
+        if options['baseline']:
+            rows = benchmarks.compare(report, benchmarks.load(options['baseline']), tolerance=options['tolerance'])
+            regressions = [row for row in rows if row['regressed']]
+            for row in rows:
+                style = self.style.ERROR if row['regressed'] else self.style.SUCCESS
+                ratio = f"{row['ratio']:.2f}x" if row['ratio'] is not None else '-'
+                self.stderr.write(style(
+                    f"{row['scenario']}.{row['metric']}: {row['baseline']:.4g} -> {row['current']:.4g} ({ratio})"
+                ))
+            if regressions:
+                raise CommandError(f'{len(regressions)} metrics regressed against {options["baseline"]}')
+
+    def format_value(self, key, value):
+        if isinstance(value, float):
+            return f'{key} {value:.4f}'
+        return f'{key} {value}'
@@ -0,0 +1,77 @@
+import time
+from collections import Counter
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from newsticker import filestore, models
+
+
+class Command(BaseCommand):
+    help = 'Move TickerRef uploads to content addressed storage (newsticker/cas), storing equal files once'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=200, help='Refs per transaction')
+        parser.add_argument('--keep-old', action='store_true', help="Don't delete the old files")
+        parser.add_argument('--recount', action='store_true', help='Only recompute the reference counts')
+
+    def handle(self, *args, **options):
+        if options['recount']:
+            unreferenced = filestore.recount()
+            self.stdout.write(self.style.SUCCESS(f'Reference counts recomputed, {len(unreferenced)} stored files without references'))
+            for name in unreferenced:
+                self.stdout.write(f'  {name}')
+            return
+
+        start = time.perf_counter()
+        qs = models.TickerRef.objects.exclude(uploadfile='').exclude(uploadfile__isnull=True).exclude(
+            uploadfile__startswith=filestore.CAS_PREFIX + '/'
+        ).order_by('pk')
+        rewritten = missing = removed = removed_bytes = 0
+        contents = set()
+        last_pk = 0
+        while True:
+            chunk = list(qs.filter(pk__gt=last_pk).only('pk', 'item_id', 'uploadfile')[:options['chunk_size']])
+            if not chunk:
+                break
+            last_pk = chunk[-1].pk
+
+            # files are hashed and copied outside of the transaction, one at a time
+            new_names = {}
+            for ref in chunk:
+                name = ref.uploadfile.name
+                if name not in new_names:
+                    if not default_storage.exists(name):
+                        missing += 1
+                        continue
+                    with default_storage.open(name, 'rb') as f:
+                        new_names[name] = filestore.store(f, name)
+            refs = [ref for ref in chunk if ref.uploadfile.name in new_names]
+            if not refs:
+                continue
+
+            old_names = set()
+            with transaction.atomic():
+                for ref in refs:
+                    old_names.add(ref.uploadfile.name)
+                    ref.uploadfile.name = new_names[ref.uploadfile.name]
+                models.TickerRef.objects.bulk_update(refs, ['uploadfile'])
+                for name, count in Counter(ref.uploadfile.name for ref in refs).items():
+                    filestore.acquire(name, count)
+                # hrefs in the rendered summaries change
+                models.TickerItem.objects.refresh_items({ref.item_id for ref in refs})
+            rewritten += len(refs)
+            contents.update(new_names.values())
+
+            if not options['keep_old']:
+                chunk_removed, chunk_bytes = filestore.delete_unused(old_names)
+                removed += chunk_removed
+                removed_bytes += chunk_bytes
+            if options['verbosity'] > 1:
+                self.stdout.write(f'{rewritten} refs rewritten, up to pk {last_pk}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{rewritten} refs now use {len(contents)} stored files, {missing} missing files skipped, '
+            f'{removed} old files ({removed_bytes / 1024 / 1024:.1f} MiB) removed in {time.perf_counter() - start:.1f}s'
+        ))
@@ -0,0 +1,32 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+
+from newsticker import ingest
+
+
+class Command(BaseCommand):
+    help = 'Import ticker items and refs from JSON Lines files (- for stdin), skipping known external_ids'
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+')
+        parser.add_argument('--batch-size', type=int, default=500, help='Items per bulk insert and transaction')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        result = ingest.IngestResult()
+        for path in options['paths']:
+            if path == '-':
+                ingest.ingest(sys.stdin, batch_size=options['batch_size'], result=result)
+            else:
+                with open(path, encoding='utf-8') as f:
+                    ingest.ingest(f, batch_size=options['batch_size'], result=result)
+
+        for lineno, message in result.errors:
+            self.stderr.write(self.style.ERROR(f'line {lineno}: {message}'))
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'{result.created} items with {result.refs} refs created, {result.skipped} skipped, '
+            f'{result.failed} failed in {elapsed:.1f}s'
+        ))
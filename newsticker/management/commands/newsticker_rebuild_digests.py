@@ -0,0 +1,32 @@
+import datetime
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Max, Min
+
+from newsticker import digests, models
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the per day digests (TickerDayDigest) from the ticker items'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='date_from', type=datetime.date.fromisoformat, help='First date (YYYY-MM-DD), default: oldest item')
+        parser.add_argument('--to', dest='date_to', type=datetime.date.fromisoformat, help='Last date (YYYY-MM-DD), default: newest item')
+        parser.add_argument('--days-per-chunk', type=int, default=31, help='Days rebuilt per transaction')
+
+    def handle(self, *args, **options):
+        date_from, date_to = options['date_from'], options['date_to']
+        if date_from is None or date_to is None:
+            bounds = models.TickerItem.objects.aggregate(first=Min('pub_dt'), last=Max('pub_dt'))
+            if bounds['first'] is None:
+                self.stdout.write('No ticker items')
+                return
+            date_from = date_from or digests.local_date(bounds['first'])
+            date_to = date_to or digests.local_date(bounds['last'])
+
+        start = time.perf_counter()
+        written = digests.rebuild(date_from, date_to, days_per_chunk=options['days_per_chunk'])
+        self.stdout.write(self.style.SUCCESS(
+            f'{written} digests for {date_from} to {date_to} written in {time.perf_counter() - start:.1f}s'
+        ))
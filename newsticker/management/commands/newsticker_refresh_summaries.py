@@ -0,0 +1,70 @@
+import datetime
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.db.models import Prefetch
+
+from newsticker import models
+
+
+class Command(BaseCommand):
+    help = 'Recompute rendered summaries and ref stats (is_in_summary, refs_in_summary_count) in chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500)
+        parser.add_argument('--force', action='store_true', help='Re-render even if the fingerprint is unchanged')
+        parser.add_argument('--from', dest='date_from', type=datetime.date.fromisoformat, help='First pub_dt date (YYYY-MM-DD)')
+        parser.add_argument('--to', dest='date_to', type=datetime.date.fromisoformat, help='Last pub_dt date (YYYY-MM-DD)')
+        parser.add_argument('--workers', type=int, default=1, help='Render in this many processes')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        workers = options['workers']
+        if workers < 1:
+            raise CommandError('--workers must be at least 1')
+
+        qs = models.TickerItem.objects.order_by('pk').prefetch_related(
+            Prefetch('tickerref_set', queryset=models.TickerRef.objects.select_related('linked_tickeritem'))
+        )
+        if options['date_from']:
+            qs = qs.filter(pub_dt__gte=models.local_day_start(options['date_from']))
+        if options['date_to']:
+            qs = qs.filter(pub_dt__lt=models.local_day_start(options['date_to'] + datetime.timedelta(days=1)))
+
+        executor = None
+        if workers > 1:
+            # workers are forked, don't let them inherit open connections
+            connections.close_all()
+            executor = ProcessPoolExecutor(max_workers=workers)
+
+        start = time.perf_counter()
+        last_pk = 0
+        total_items = total_refs = seen = 0
+        try:
+            while True:
+                chunk = list(qs.filter(pk__gt=last_pk)[:chunk_size])
+                if not chunk:
+                    break
+                with transaction.atomic():
+                    items_updated, refs_updated = models.TickerItem.objects.refresh_summaries(
+                        chunk, force=options['force'], batch_size=chunk_size, executor=executor
+                    )
+                last_pk = chunk[-1].pk
+                seen += len(chunk)
+                total_items += items_updated
+                total_refs += refs_updated
+                if options['verbosity'] > 1:
+                    elapsed = time.perf_counter() - start
+                    self.stdout.write(f'{seen} items checked, up to pk {last_pk} ({seen / elapsed:.0f} items/s)')
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        elapsed = time.perf_counter() - start
+        rate = seen / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'{seen} items checked, {total_items} items and {total_refs} refs updated '
+            f'in {elapsed:.1f}s ({rate:.0f} items/s, {workers} worker(s))'
+        ))
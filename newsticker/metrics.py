@@ -0,0 +1,193 @@
+import logging
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.signals import setting_changed
+from django.db import connection
+from django.dispatch import Signal, receiver
+from django.utils.module_loading import import_string
+
+
+logger = logging.getLogger(__name__)
+
+# sent by SignalSink, kwargs: kind ('timing' or 'count'), name, value, tags
+metric_recorded = Signal()
+
+
+class MetricsSink:
+    def timing(self, name, seconds, tags):
+        pass
+
+    def count(self, name, value, tags):
+        pass
+
+
+class LoggingSink(MetricsSink):
+    def timing(self, name, seconds, tags):
+        logger.debug('%s %.6fs %s', name, seconds, tags)
+
+    def count(self, name, value, tags):
+        logger.debug('%s +%s %s', name, value, tags)
+
+
+class SignalSink(MetricsSink):
+    def timing(self, name, seconds, tags):
+        metric_recorded.send(sender=None, kind='timing', name=name, value=seconds, tags=tags)
+
+    def count(self, name, value, tags):
+        metric_recorded.send(sender=None, kind='count', name=name, value=value, tags=tags)
+
+
+class RequestMetrics:
+    # Totals of one request, filled by the debug middleware: name -> [calls, total]
+    def __init__(self):
+        self.timings = {}
+        self.counts = {}
+
+    def timing(self, name, seconds, tags):
+        entry = self.timings.setdefault(name, [0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+
+    def count(self, name, value, tags):
+        entry = self.counts.setdefault(name, [0, 0])
+        entry[0] += 1
+        entry[1] += value
+
+    def lines(self):
+        for name, (calls, total) in sorted(self.timings.items()):
+            yield f'{name}: {calls}x {total * 1000:.2f}ms'
+        for name, (calls, total) in sorted(self.counts.items()):
+            yield f'{name}: {total} ({calls}x)'
+
+
+_sink = None
+_sink_loaded = False
+_request_metrics = ContextVar('newsticker_request_metrics', default=None)
+
+
+def get_sink():
+    # NEWSTICKER_METRICS_SINK: dotted path of a MetricsSink subclass or None (default, disabled)
+    global _sink, _sink_loaded
+    if not _sink_loaded:
+        path = getattr(settings, 'NEWSTICKER_METRICS_SINK', None)
+        _sink = import_string(path)() if path else None
+        _sink_loaded = True
+    return _sink
+
+
+@receiver(setting_changed)
+def reset_sink(setting, **kwargs):
+    global _sink_loaded
+    if setting == 'NEWSTICKER_METRICS_SINK':
+        _sink_loaded = False
+
+
+def is_enabled():
+    return (_sink if _sink_loaded else get_sink()) is not None or _request_metrics.get() is not None
+
+
+def _targets():
+    sink = _sink if _sink_loaded else get_sink()
+    request_metrics = _request_metrics.get()
+    return [target for target in (sink, request_metrics) if target is not None]
+
+
+def timing(name, seconds, **tags):
+    for target in _targets():
+        target.timing(name, seconds, tags)
+
+
+def count(name, value=1, **tags):
+    for target in _targets():
+        target.count(name, value, tags)
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+NULL_TIMER = _NullTimer()
+
+
+class Timer:
+    def __init__(self, name, tags):
+        self.name = name
+        self.tags = tags
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        timing(self.name, time.perf_counter() - self.start, **self.tags)
+        return False
+
+
+def timer(name, **tags):
+    # No-op singleton while no sink and no request collector is active
+    if not is_enabled():
+        return NULL_TIMER
+    return Timer(name, tags)
+
+
+class QueryTimer(Timer):
+    # Timer that also reports number and total duration of the queries run inside it
+    def __enter__(self):
+        self.queries = 0
+        self.query_time = 0.0
+        self.wrapper = connection.execute_wrapper(self)
+        self.wrapper.__enter__()
+        return super().__enter__()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.query_time += time.perf_counter() - start
+
+    def __exit__(self, *exc_info):
+        self.wrapper.__exit__(*exc_info)
+        super().__exit__(*exc_info)
+        count(f'{self.name}.queries', self.queries, **self.tags)
+        timing(f'{self.name}.query_time', self.query_time, **self.tags)
+        return False
+
+
+def query_timer(name, **tags):
+    if not is_enabled():
+        return NULL_TIMER
+    return QueryTimer(name, tags)
+
+
+class MetricsDebugMiddleware:
+    # Logs the newsticker metrics of every request (logger newsticker.metrics, level INFO) and adds
+    # a Server-Timing header. Only active with DEBUG or NEWSTICKER_METRICS_DEBUG.
+    def __init__(self, get_response):
+        if not getattr(settings, 'NEWSTICKER_METRICS_DEBUG', settings.DEBUG):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request_metrics = RequestMetrics()
+        token = _request_metrics.set(request_metrics)
+        try:
+            with QueryTimer('request', {}):
+                response = self.get_response(request)
+        finally:
+            _request_metrics.reset(token)
+
+        logger.info('%s %s\n  %s', request.method, request.path, '\n  '.join(request_metrics.lines()))
+        response['Server-Timing'] = ', '.join(
+            f'{name.replace(".", "-")};dur={total * 1000:.2f}'
+            for name, (calls, total) in sorted(request_metrics.timings.items())
+        )
+        return response
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('newsticker', '0012_sharelink_shared_with_notes_alter_sharelink_short'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tickeritem',
+            name='rendered_summary',
+            field=models.TextField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='tickeritem',
+            name='rendered_summary_fingerprint',
+            field=models.CharField(blank=True, editable=False, max_length=40, null=True),
+        ),
+    ]
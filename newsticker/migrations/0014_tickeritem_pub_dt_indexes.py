@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('newsticker', '0013_tickeritem_rendered_summary_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='tickeritem',
+            index=models.Index(fields=['pub_dt', 'category'], name='newsticker_ti_pub_dt_cat_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tickeritem',
+            index=models.Index(fields=['category', 'pub_dt'], name='newsticker_ti_cat_pub_dt_idx'),
+        ),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:36
+
+import datetime
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def clicks_log_to_clicks(apps, schema_editor):
+    ShareLink = apps.get_model('newsticker', 'ShareLink')
+    ShareLinkClick = apps.get_model('newsticker', 'ShareLinkClick')
+    tz = timezone.get_current_timezone()
+    for sharelink in ShareLink.objects.exclude(clicks_log__isnull=True).exclude(clicks_log='').iterator():
+        clicks = []
+        for line in sharelink.clicks_log.splitlines():
+            # {date};{time};{user_name};{user_agent};{content_params}, the user agent may contain ";"
+            parts = line.split(';')
+            if len(parts) < 5:
+                continue
+            try:
+                ts = datetime.datetime.strptime(f'{parts[0]};{parts[1]}', '%Y-%m-%d;%H:%M:%S')
+            except ValueError:
+                continue
+            user_agent, _, content_params = ';'.join(parts[3:]).rpartition(';')
+            clicks.append(ShareLinkClick(
+                sharelink=sharelink,
+                ts=timezone.make_aware(ts, timezone=tz),
+                user_name=parts[2],
+                user_agent=user_agent,
+                content_params=content_params[:255],
+            ))
+        ShareLinkClick.objects.bulk_create(clicks, batch_size=500)
+
+
+def clicks_to_clicks_log(apps, schema_editor):
+    ShareLink = apps.get_model('newsticker', 'ShareLink')
+    ShareLinkClick = apps.get_model('newsticker', 'ShareLinkClick')
+    tz = timezone.get_current_timezone()
+    for sharelink in ShareLink.objects.iterator():
+        lines = []
+        for click in ShareLinkClick.objects.filter(sharelink=sharelink).order_by('ts', 'pk').iterator():
+            dt_str = timezone.localtime(click.ts, timezone=tz).strftime("%Y-%m-%d;%H:%M:%S")
+            lines.append(f'{dt_str};{click.user_name};{click.user_agent};{click.content_params}\n')
+        if lines:
+            sharelink.clicks_log = ''.join(lines)
+            sharelink.save(update_fields=['clicks_log'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('newsticker', '0014_tickeritem_pub_dt_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShareLinkClick',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ts', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user_name', models.CharField(blank=True, default='', max_length=150)),
+                ('user_agent', models.TextField(blank=True, default='')),
+                ('content_params', models.CharField(blank=True, default='', max_length=255)),
+                ('sharelink', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='clicks', to='newsticker.sharelink')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['sharelink', 'ts'], name='newsticker_slc_link_ts_idx')],
+            },
+        ),
+        migrations.RunPython(clicks_log_to_clicks, clicks_to_clicks_log),
+        migrations.RemoveField(
+            model_name='sharelink',
+            name='clicks_log',
+        ),
+    ]
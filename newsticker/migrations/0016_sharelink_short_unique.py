@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:37
+
+import random
+import string
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def dedupe_shorts(apps, schema_editor):
+    ShareLink = apps.get_model('newsticker', 'ShareLink')
+    alphabet = string.ascii_uppercase + string.ascii_lowercase + string.digits
+    taken = set(ShareLink.objects.values_list('short', flat=True))
+    duplicates = ShareLink.objects.values('short').annotate(n=Count('pk')).filter(n__gt=1).values_list('short', flat=True)
+    for short in list(duplicates):
+        # keep the oldest link, give the others a fresh code
+        for sharelink in ShareLink.objects.filter(short=short).order_by('pk')[1:]:
+            new_short = short
+            while new_short in taken:
+                new_short = ''.join(random.choices(alphabet, k=5))
+            taken.add(new_short)
+            sharelink.short = new_short
+            sharelink.save(update_fields=['short'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('newsticker', '0015_sharelinkclick'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_shorts, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='sharelink',
+            name='short',
+            field=models.CharField(editable=False, max_length=5, null=True, unique=True),
+        ),
+    ]
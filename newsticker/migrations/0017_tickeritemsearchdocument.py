@@ -0,0 +1,90 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:43
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+POSTGRES_FORWARD = [
+    'ALTER TABLE newsticker_tickeritemsearchdocument ADD COLUMN search_vector tsvector',
+    'CREATE INDEX newsticker_tisd_vector_idx ON newsticker_tickeritemsearchdocument USING GIN (search_vector)',
+    '''CREATE FUNCTION newsticker_tisd_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector := to_tsvector('{config}'::regconfig, coalesce(NEW.text, ''));
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql''',
+    '''CREATE TRIGGER newsticker_tisd_vector_trigger BEFORE INSERT OR UPDATE OF text
+    ON newsticker_tickeritemsearchdocument FOR EACH ROW EXECUTE FUNCTION newsticker_tisd_vector_update()''',
+]
+POSTGRES_BACKWARD = [
+    'DROP TRIGGER IF EXISTS newsticker_tisd_vector_trigger ON newsticker_tickeritemsearchdocument',
+    'DROP FUNCTION IF EXISTS newsticker_tisd_vector_update()',
+]
+SQLITE_FORWARD = [
+    '''CREATE VIRTUAL TABLE newsticker_tickeritem_fts USING fts5(
+    text, content='newsticker_tickeritemsearchdocument', content_rowid='item_id', tokenize='unicode61 remove_diacritics 2')''',
+    '''CREATE TRIGGER newsticker_tisd_ai AFTER INSERT ON newsticker_tickeritemsearchdocument BEGIN
+        INSERT INTO newsticker_tickeritem_fts(rowid, text) VALUES (new.item_id, new.text);
+    END''',
+    '''CREATE TRIGGER newsticker_tisd_ad AFTER DELETE ON newsticker_tickeritemsearchdocument BEGIN
+        INSERT INTO newsticker_tickeritem_fts(newsticker_tickeritem_fts, rowid, text) VALUES ('delete', old.item_id, old.text);
+    END''',
+    '''CREATE TRIGGER newsticker_tisd_au AFTER UPDATE ON newsticker_tickeritemsearchdocument BEGIN
+        INSERT INTO newsticker_tickeritem_fts(newsticker_tickeritem_fts, rowid, text) VALUES ('delete', old.item_id, old.text);
+        INSERT INTO newsticker_tickeritem_fts(rowid, text) VALUES (new.item_id, new.text);
+    END''',
+]
+SQLITE_BACKWARD = [
+    'DROP TRIGGER IF EXISTS newsticker_tisd_ai',
+    'DROP TRIGGER IF EXISTS newsticker_tisd_ad',
+    'DROP TRIGGER IF EXISTS newsticker_tisd_au',
+    'DROP TABLE IF EXISTS newsticker_tickeritem_fts',
+]
+
+
+def sqlite_supports_fts5(schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        return 'ENABLE_FTS5' in {row[0] for row in cursor.fetchall()}
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        config = getattr(settings, 'NEWSTICKER_SEARCH_CONFIG', 'german')
+        for sql in POSTGRES_FORWARD:
+            schema_editor.execute(sql.replace('{config}', config))
+    elif vendor == 'sqlite' and sqlite_supports_fts5(schema_editor):
+        for sql in SQLITE_FORWARD:
+            schema_editor.execute(sql)
+    # other databases use the basic search backend
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        for sql in POSTGRES_BACKWARD:
+            schema_editor.execute(sql)
+    elif vendor == 'sqlite':
+        for sql in SQLITE_BACKWARD:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('newsticker', '0016_sharelink_short_unique'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TickerItemSearchDocument',
+            fields=[
+                ('item', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='newsticker.tickeritem')),
+                ('text', models.TextField(blank=True, default='')),
+            ],
+        ),
+        # run `manage.py newsticker_refresh_summaries --force` afterwards to fill the documents
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
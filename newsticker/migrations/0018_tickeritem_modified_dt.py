@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('newsticker', '0017_tickeritemsearchdocument'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tickeritem',
+            name='modified_dt',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
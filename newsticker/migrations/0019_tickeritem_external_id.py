@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('newsticker', '0018_tickeritem_modified_dt'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tickeritem',
+            name='external_id',
+            field=models.CharField(blank=True, editable=False, max_length=255, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def build_digests(apps, schema_editor):
+    # same grouping as newsticker.digests.build_rows(), all items in pub_dt order
+    TickerItem = apps.get_model('newsticker', 'TickerItem')
+    TickerDayDigest = apps.get_model('newsticker', 'TickerDayDigest')
+    tz = timezone.get_current_timezone()
+    rows = {}
+    for pk, pub_dt, category_id, modified_dt in TickerItem.objects.order_by('pub_dt', 'pk').values_list(
+            'pk', 'pub_dt', 'category_id', 'modified_dt').iterator(chunk_size=2000):
+        key = (timezone.localtime(pub_dt, timezone=tz).date(), category_id)
+        row = rows.get(key)
+        if row is None:
+            row = rows[key] = TickerDayDigest(date=key[0], category_id=category_id, item_ids=[], last_modified=modified_dt)
+        row.item_ids.append(pk)
+        if modified_dt and (row.last_modified is None or modified_dt > row.last_modified):
+            row.last_modified = modified_dt
+    for row in rows.values():
+        row.item_count = len(row.item_ids)
+    TickerDayDigest.objects.bulk_create(rows.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('newsticker', '0019_tickeritem_external_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TickerDayDigest',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('item_ids', models.JSONField(default=list)),
+                ('item_count', models.IntegerField(default=0)),
+                ('last_modified', models.DateTimeField(blank=True, null=True)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='newsticker.tickercategory')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('date', 'category'), name='newsticker_digest_date_cat_uniq')],
+            },
+        ),
+        migrations.RunPython(build_digests, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('newsticker', '0020_tickerdaydigest'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='tickeritem',
+            index=models.Index(fields=['created_dt', 'id'], name='newsticker_ti_created_dt_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('newsticker', '0021_tickeritem_created_dt_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TickerItemArchive',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('pub_dt', models.DateTimeField(db_index=True)),
+                ('category_id', models.IntegerField(null=True)),
+                ('headline', models.CharField(max_length=255)),
+                ('external_id', models.CharField(blank=True, max_length=255, null=True)),
+                ('archived_dt', models.DateTimeField(auto_now_add=True)),
+                ('data', models.JSONField()),
+            ],
+        ),
+    ]
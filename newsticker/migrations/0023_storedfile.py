@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('newsticker', '0022_tickeritemarchive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredFile',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('sha256', models.CharField(db_index=True, max_length=64)),
+                ('size', models.BigIntegerField()),
+                ('original_name', models.CharField(blank=True, default='', max_length=255)),
+                ('refcount', models.IntegerField(default=0)),
+                ('created_dt', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
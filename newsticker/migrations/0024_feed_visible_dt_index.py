@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-17 11:29
+
+import django.db.models.functions.comparison
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('newsticker', '0023_storedfile'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='tickeritem',
+            name='newsticker_ti_created_dt_idx',
+        ),
+        migrations.AddIndex(
+            model_name='tickeritem',
+            index=models.Index(django.db.models.functions.comparison.Greatest('created_dt', 'pub_dt'), models.F('id'), name='newsticker_ti_visible_dt_idx'),
+        ),
+    ]
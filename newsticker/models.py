@@ -1,24 +1,75 @@
-from collections import OrderedDict
+import datetime
+import time
+from collections import OrderedDict, namedtuple
+from contextlib import contextmanager
+from contextvars import ContextVar
 from urllib.parse import urlencode
 
-from django.db import models
-from django.urls import reverse, resolve
+from django.conf import settings
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, F, Max, Prefetch, Q
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_delete, post_save
+from django.urls import reverse
 from django.utils import timezone
-from treebeard.mp_tree import MP_Node
+from treebeard.mp_tree import MP_Node, MP_NodeManager, MP_NodeQuerySet
 from djangocms_text_ckeditor.fields import HTMLField
 
-from bs4 import BeautifulSoup
+import hashlib
 import string
 import random
 
+from . import caching, categories, clicks, daycache, digests, filestore, metrics, rendering, search
+from .urlbuilder import OverviewUrlBuilder, overview_base_url
+
+
+_summary_refresh_deferred = ContextVar('newsticker_summary_refresh_deferred', default=False)
+
+
+@contextmanager
+def defer_summary_refresh():
+    # Skip the per-save summary refresh of TickerItem/TickerRef, the caller refreshes once afterwards
+    token = _summary_refresh_deferred.set(True)
+    try:
+        yield
+    finally:
+        _summary_refresh_deferred.reset(token)
+
 
 def tickerref_file_upload(instance, filename):
     return 'newsticker/files/{0}/{1}'.format(instance.item.pk, filename)
 
 
+class TickerCategoryQuerySet(MP_NodeQuerySet):
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        categories.invalidate_category_tree()
+        return result
+
+
+class TickerCategoryManager(MP_NodeManager):
+    def get_queryset(self):
+        return TickerCategoryQuerySet(self.model, using=self._db).order_by('path')
+
+    def tree(self):
+        return categories.get_category_tree()
+
+
 class TickerCategory(MP_Node):
     name = models.CharField(max_length=60)
     node_order_by = ['name']
+    objects = TickerCategoryManager()
+
+    # add_root/add_child/add_sibling end in save(), move() and deletes only run queryset updates
+    def save(self, *args, **kwargs):
+        result = super().save(*args, **kwargs)
+        categories.invalidate_category_tree()
+        return result
+
+    def move(self, target, pos=None):
+        result = super().move(target, pos=pos)
+        categories.invalidate_category_tree()
+        return result
 
     def __str__(self):
         return self.name
@@ -46,28 +97,99 @@ class TickerItemType(models.Model):
         ordering = ['name']
 
 
+WindowFingerprint = namedtuple('WindowFingerprint', ['etag', 'last_modified', 'count'])
+
+
+def local_day_start(date):
+    dt = datetime.datetime.combine(date, datetime.time.min)
+    if settings.USE_TZ:
+        dt = timezone.make_aware(dt, timezone=timezone.get_current_timezone())
+    return dt
+
+
 class TickerItemManager(models.Manager):
-    def current(self, ref_date=None, limit_days=3, limit_categories_qs=None):
+    def with_relations(self, qs=None):
+        if qs is None:
+            qs = self.get_queryset()
+        return qs.select_related('category', 'publication', 'item_type').prefetch_related(
+            Prefetch('tickerref_set', queryset=TickerRef.objects.select_related('linked_tickeritem'))
+        )
+
+    def current(self, ref_date=None, limit_days=3, limit_categories_qs=None, limit_category_ids=None):
         #today = timezone.localtime(timezone.now(), timezone=timezone.get_current_timezone()).date()
         if ref_date is None:
             ref_date = timezone.now().date()
         start_calc_date = ref_date - timezone.timedelta(days=limit_days)
-        qs = self.filter(pub_dt__date__range=(start_calc_date, ref_date))
-        #print(f'pub_dt__date__range=("{start_calc_date}", "{ref_date}")')
-        if limit_categories_qs:
+        # Same window as pub_dt__date__range=(start_calc_date, ref_date), but as a plain pub_dt
+        # range so the (pub_dt, category) / (category, pub_dt) indexes can be used. SQLite plans
+        # (checked in newsticker.tests.test_queries):
+        #   SEARCH newsticker_tickeritem USING INDEX newsticker_ti_pub_dt_cat_idx (pub_dt>? AND pub_dt<?)
+        #   SEARCH newsticker_tickeritem USING INDEX newsticker_ti_cat_pub_dt_idx (category_id=? AND pub_dt>? AND pub_dt<?)
+        # On PostgreSQL an (Bitmap) Index Scan on the same indexes is expected but not verified yet,
+        # the same test checks it when run with a PostgreSQL database.
+        # Only the ordering by local date is left as a sort over the (small) window.
+        qs = self.filter(
+            pub_dt__gte=local_day_start(start_calc_date),
+            pub_dt__lt=local_day_start(ref_date + timezone.timedelta(days=1)),
+        )
+        if limit_categories_qs is not None:
             qs = qs.filter(category__in=limit_categories_qs)
+        if limit_category_ids is not None:
+            # e.g. TickerCategory.objects.tree().expand_ids(ids) to include descendants without a path query
+            qs = qs.filter(category_id__in=limit_category_ids)
         qs = qs.order_by('-pub_dt__date', 'category__path', 'pub_dt')
-        return qs
-
-    def current_by_date(self, qs=None, limit_days=3, limit_categories_qs=None, ref_date=None, short_link=None):
+        return self.with_relations(qs)
+
+    async def acurrent(self, ref_date=None, limit_days=3, limit_categories_qs=None, limit_category_ids=None):
+        # current() evaluated with async iteration, returns the list of items incl. prefetched refs
+        qs = self.current(
+            ref_date=ref_date, limit_days=limit_days,
+            limit_categories_qs=limit_categories_qs, limit_category_ids=limit_category_ids
+        )
+        return [item async for item in qs]
+
+    def window_fingerprint(self, ref_date=None, limit_days=3, limit_categories_qs=None, limit_category_ids=None, short_link=None):
+        # Changes whenever the overview for these parameters could change, costs one aggregate query.
+        # Item and ref edits bump modified_dt (refs through refresh_summaries), deletions change count/max pk.
+        if ref_date is None:
+            ref_date = timezone.now().date()
+        qs = self.current(
+            ref_date=ref_date, limit_days=limit_days,
+            limit_categories_qs=limit_categories_qs, limit_category_ids=limit_category_ids
+        )
+        stats = qs.order_by().aggregate(count=Count('pk'), max_pk=Max('pk'), last_modified=Max('modified_dt'))
+        key = (
+            rendering.SUMMARY_RENDER_VERSION,
+            ref_date.isoformat(),
+            limit_days,
+            str(limit_categories_qs.query) if limit_categories_qs is not None else None,
+            sorted(limit_category_ids) if limit_category_ids is not None else None,
+            short_link.short if short_link else None,
+            categories.get_category_tree().version,
+            stats['count'],
+            stats['max_pk'],
+            stats['last_modified'].isoformat() if stats['last_modified'] else None,
+        )
+        return WindowFingerprint(
+            etag=hashlib.sha1(repr(key).encode()).hexdigest(),
+            last_modified=stats['last_modified'],
+            count=stats['count'],
+        )
+
+    def current_by_date(self, qs=None, limit_days=3, limit_categories_qs=None, ref_date=None, short_link=None, limit_category_ids=None):
         if qs is None:
-            qs = self.current(ref_date=ref_date, limit_days=limit_days, limit_categories_qs=limit_categories_qs)
+            qs = self.current(ref_date=ref_date, limit_days=limit_days, limit_categories_qs=limit_categories_qs, limit_category_ids=limit_category_ids)
+
+        with metrics.query_timer('manager.current_by_date', days=limit_days):
+            return self._group_by_date(qs, short_link)
 
+    def _group_by_date(self, qs, short_link):
+        tree = categories.get_category_tree()
         by_date = OrderedDict()
         for ni in qs:
             ni.short_link = short_link
             d = timezone.localtime(ni.pub_dt, timezone=timezone.get_current_timezone()).date()
-            cat = ni.category
+            cat = tree.get(ni.category_id) or ni.category
             if d not in by_date:
                 by_date[d] = OrderedDict()
 
@@ -75,8 +197,209 @@ class TickerItemManager(models.Manager):
                 by_date[d][cat] = [ni]
             else:
                 by_date[d][cat].append(ni)
+
+        # category order from the cached tree, so qs doesn't need to be ordered by category__path
+        for d, cats in by_date.items():
+            by_date[d] = OrderedDict(sorted(cats.items(), key=lambda kv: kv[0].path))
+        return by_date
+
+    def iter_by_date(self, qs=None, limit_days=3, limit_categories_qs=None, ref_date=None, short_link=None, chunk_size=200, limit_category_ids=None):
+        # Streaming variant of current_by_date(), yields (date, category, items) groups.
+        # qs must be ordered by date and category like current(), otherwise groups repeat.
+        if qs is None:
+            qs = self.current(ref_date=ref_date, limit_days=limit_days, limit_categories_qs=limit_categories_qs, limit_category_ids=limit_category_ids)
+
+        group_key = None
+        group_items = []
+        for ni in qs.iterator(chunk_size=chunk_size):
+            ni.short_link = short_link
+            d = timezone.localtime(ni.pub_dt, timezone=timezone.get_current_timezone()).date()
+            key = (d, ni.category_id)
+            if key != group_key:
+                if group_items:
+                    yield group_key[0], group_items[0].category, group_items
+                group_key = key
+                group_items = []
+            group_items.append(ni)
+        if group_items:
+            yield group_key[0], group_items[0].category, group_items
+
+    def digest_by_date(self, limit_days=3, limit_categories_qs=None, ref_date=None, short_link=None, limit_category_ids=None):
+        # Same result as current_by_date(), the grouping comes from TickerDayDigest rows: one query
+        # on the (date, category) index for the window and one for the items (plus their refs)
+        if ref_date is None:
+            ref_date = timezone.now().date()
+        day_digests = TickerDayDigest.objects.filter(
+            date__range=(ref_date - timezone.timedelta(days=limit_days), ref_date)
+        )
+        if limit_categories_qs is not None:
+            day_digests = day_digests.filter(category__in=limit_categories_qs)
+        if limit_category_ids is not None:
+            day_digests = day_digests.filter(category_id__in=limit_category_ids)
+        day_digests = list(day_digests.order_by('-date').values_list('date', 'category_id', 'item_ids'))
+
+        item_ids = [pk for date, category_id, ids in day_digests for pk in ids]
+        items = {item.pk: item for item in self.with_relations(self.filter(pk__in=item_ids))} if item_ids else {}
+        tree = categories.get_category_tree()
+        by_date = OrderedDict()
+        for date, category_id, ids in day_digests:
+            # ids of items deleted since the digest was written are skipped
+            group = [items[pk] for pk in ids if pk in items]
+            if not group:
+                continue
+            for ni in group:
+                ni.short_link = short_link
+            by_date.setdefault(date, OrderedDict())[tree.get(category_id) or group[0].category] = group
+        for d, cats in by_date.items():
+            by_date[d] = OrderedDict(sorted(cats.items(), key=lambda kv: kv[0].path))
         return by_date
 
+    async def aiter_by_date(self, qs=None, limit_days=3, limit_categories_qs=None, ref_date=None, short_link=None, chunk_size=200, limit_category_ids=None):
+        # Async variant of iter_by_date(), yields the (date, category, items) groups of current_by_date()
+        # in the same order and with the same (cached tree) category instances
+        if qs is None:
+            qs = self.current(ref_date=ref_date, limit_days=limit_days, limit_categories_qs=limit_categories_qs, limit_category_ids=limit_category_ids)
+
+        tree = await categories.aget_category_tree()
+        group_key = None
+        group_items = []
+        async for ni in qs.aiterator(chunk_size=chunk_size):
+            ni.short_link = short_link
+            d = timezone.localtime(ni.pub_dt, timezone=timezone.get_current_timezone()).date()
+            key = (d, ni.category_id)
+            if key != group_key:
+                if group_items:
+                    yield group_key[0], tree.get(group_key[1]) or group_items[0].category, group_items
+                group_key = key
+                group_items = []
+            group_items.append(ni)
+        if group_items:
+            yield group_key[0], tree.get(group_key[1]) or group_items[0].category, group_items
+
+    def page(self, after=None, limit=50, qs=None, limit_categories_qs=None, descending=True):
+        # Keyset pagination by (pub_dt, pk), returns (items, cursor of the next page or None)
+        if qs is None:
+            qs = self.with_relations()
+        if limit_categories_qs is not None:
+            qs = qs.filter(category__in=limit_categories_qs)
+        if descending:
+            qs = qs.order_by('-pub_dt', '-pk')
+            if after:
+                qs = qs.filter(Q(pub_dt__lt=after[0]) | Q(pub_dt=after[0], pk__lt=after[1]))
+        else:
+            qs = qs.order_by('pub_dt', 'pk')
+            if after:
+                qs = qs.filter(Q(pub_dt__gt=after[0]) | Q(pub_dt=after[0], pk__gt=after[1]))
+
+        items = list(qs[:limit + 1])
+        next_cursor = None
+        if len(items) > limit:
+            items = items[:limit]
+            next_cursor = (items[-1].pub_dt, items[-1].pk)
+        return items, next_cursor
+
+    def refresh_summaries(self, items, force=False, batch_size=500, executor=None):
+        # Renders in-process or, given an executor (e.g. ProcessPoolExecutor), in parallel
+        url_builder = OverviewUrlBuilder()
+        pending = []
+        for item in items:
+            tickerrefs = list(item.tickerref_set.all())
+            fingerprint = item.get_summary_fingerprint(tickerrefs, base_url=url_builder.base_url)
+            if not force and item.rendered_summary is not None and item.rendered_summary_fingerprint == fingerprint:
+                continue
+            pending.append((item, tickerrefs, fingerprint))
+
+        engine = rendering.get_engine()
+        jobs = [
+            (item.summary or '', rendering.ref_specs(tickerrefs, url_builder=url_builder), engine)
+            for item, tickerrefs, fingerprint in pending
+        ]
+        if executor is not None:
+            results = executor.map(rendering.render_job, jobs, chunksize=max(1, len(jobs) // 32))
+        else:
+            results = map(rendering.render_job, jobs)
+
+        items_to_update = []
+        refs_to_update = []
+        search_documents = []
+        now = timezone.now()
+        for (item, tickerrefs, fingerprint), (rendered, replaced) in zip(pending, results):
+            for i, ref in enumerate(tickerrefs):
+                is_in_summary = i in replaced
+                if ref.is_in_summary != is_in_summary:
+                    ref.is_in_summary = is_in_summary
+                    refs_to_update.append(ref)
+            item.refs_in_summary_count = len(replaced)
+            item.rendered_summary = rendered
+            item.rendered_summary_fingerprint = fingerprint
+            item.modified_dt = now
+            items_to_update.append(item)
+            search_documents.append(TickerItemSearchDocument(item=item, text=search.document_text(item, tickerrefs)))
+
+        with metrics.query_timer('summary.write'):
+            self._write_summaries(items_to_update, refs_to_update, search_documents, batch_size)
+        daycache.invalidate_items(items_to_update)
+        # modified_dt changed
+        digests.refresh_items(items_to_update)
+        return len(items_to_update), len(refs_to_update)
+
+    def _write_summaries(self, items_to_update, refs_to_update, search_documents, batch_size):
+        if items_to_update:
+            self.bulk_update(
+                items_to_update,
+                ['rendered_summary', 'rendered_summary_fingerprint', 'refs_in_summary_count', 'modified_dt'],
+                batch_size=batch_size
+            )
+        if refs_to_update:
+            TickerRef.objects.bulk_update(refs_to_update, ['is_in_summary'], batch_size=batch_size)
+        if search_documents:
+            TickerItemSearchDocument.objects.bulk_create(
+                search_documents,
+                batch_size=batch_size,
+                update_conflicts=True,
+                unique_fields=['item'],
+                update_fields=['text'],
+            )
+
+    def refresh_items(self, item_ids, batch_size=500):
+        item_ids = sorted(item_ids)
+        updated = 0
+        for i in range(0, len(item_ids), batch_size):
+            items = self.with_relations(self.filter(pk__in=item_ids[i:i + batch_size]))
+            items_updated, refs_updated = self.refresh_summaries(items, batch_size=batch_size)
+            updated += items_updated
+        return updated
+
+    def get_dependent_ids(self, item_ids, max_depth=1):
+        # Items linking to item_ids through TickerRef.linked_tickeritem, breadth first.
+        # A rendering only embeds its direct targets, deeper levels are for callers that need them.
+        seen = set(item_ids)
+        frontier = set(item_ids)
+        dependent_ids = set()
+        depth = 0
+        while frontier and (max_depth is None or depth < max_depth):
+            found = set(
+                TickerRef.objects.filter(linked_tickeritem_id__in=frontier).values_list('item_id', flat=True).distinct()
+            )
+            # cycles end here
+            frontier = found - seen
+            seen |= frontier
+            dependent_ids |= frontier
+            depth += 1
+        return dependent_ids
+
+    def refresh_dependents(self, item_ids, max_depth=1, batch_size=500):
+        dependent_ids = self.get_dependent_ids(item_ids, max_depth=max_depth)
+        if not dependent_ids:
+            return 0
+        return self.refresh_items(dependent_ids, batch_size=batch_size)
+
+    def search(self, query, qs=None):
+        # Full text search over headline, summary text and ref titles, see newsticker.search
+        if qs is None:
+            qs = self.with_relations().order_by('-pub_dt')
+        return search.search(qs, query)
+
 
 class TickerRefManager(models.Manager):
     def in_summary(self):
@@ -93,6 +416,7 @@ class TickerItem(models.Model):
     publication = models.ForeignKey(TickerPublication, on_delete=models.CASCADE)
     item_type = models.ForeignKey(TickerItemType, on_delete=models.CASCADE)
     created_dt = models.DateTimeField(auto_now_add=True)
+    modified_dt = models.DateTimeField(auto_now=True)
     pub_dt = models.DateTimeField(default=timezone.now)
     headline = models.CharField(max_length=255)
     summary = HTMLField(
@@ -102,78 +426,62 @@ class TickerItem(models.Model):
     )
     has_summary = models.BooleanField(default=True, editable=False)
     refs_in_summary_count = models.IntegerField(default=0, editable=False)
+    rendered_summary = models.TextField(null=True, blank=True, editable=False)
+    rendered_summary_fingerprint = models.CharField(max_length=40, null=True, blank=True, editable=False)
+    # id of the item in the feed it was imported from (newsticker.ingest)
+    external_id = models.CharField(max_length=255, null=True, blank=True, unique=True, editable=False)
     objects = TickerItemManager()
 
-    def get_rendered_summary(self):
-        soup = BeautifulSoup(self.summary, 'html.parser')
-        marker_tags = soup.find_all("span", {'class': "marker"})
-        tickerrefs = list(self.tickerref_set.all())
-        ref_type_icon = {
-            'website': 'fa ms-1 fa-globe',
-            'pdf': 'fa ms-1 fa-file-pdf',
-            'video': 'fa ms-1 fa-video',
-            'image': 'fa ms-1 fa-image',
-            'tickeritem': 'fa ms-1 fa-link'
-        }
-
-        ref_replaced_in_summary = []
-
-        for i, marker_tag in enumerate(marker_tags):
-            try:
-                ref = tickerrefs[i]
-            except IndexError:
-                ref = None
-            if ref:
-                href = ref.get_href(short_link=self.short_link)
-                ref_text = ref.text
-                ref_title = ref.title
-                if href:
-                    ref_title = ref.get_ref_title()
-                    target = ''
-                    if not ref.get_is_local():
-                        target = '_blank'
-                    # create Tags
-                    a_tag = soup.new_tag('a', attrs={'href': href, 'title': ref_title, 'data-ref-type': ref.ref_type, 'target': target})
-                    sup_tag = soup.new_tag('sup', attrs={'class': 'mx-1'})
-                    fa_icon_tag = soup.new_tag('i', attrs={'class': ref_type_icon[ref.ref_type]})
-
-                    if '^' in marker_tag.string:
-                        a_tag.string = ''
-                    else:
-                        a_tag.string = marker_tag.string
-                    # sup-Tag ID
-                    #sup_tag.string = str(ref.pk) + ""
-                    sup_tag.string = ""
-                    # i-Tag
-                    sup_tag.append(fa_icon_tag)
-                    a_tag.append(sup_tag)
-
-                    marker_tag.replace_with(a_tag)
-                    ref_replaced_in_summary.append(ref)
-
-                if ref_text and ref.ref_type == 'abbreviation':
-                    abbr_tag = soup.new_tag('abbr', attrs={
-                        'title': ref_text,
-                        #'class': 'initialism'
-                    })
-                    if ref_title:
-                        abbr_tag.string = ref_title
-                    else:
-                        abbr_tag.string = marker_tag.string
-                    hidden_tag = soup.new_tag('span', attrs={'class': 'd-none hidden-abbr'})
-                    hidden_tag.string = f' ({ref_text})'
-                    abbr_tag.append(hidden_tag)
-                    marker_tag.replace_with(abbr_tag)
-                    ref_replaced_in_summary.append(ref)
-
-        # Update Ref stats
+    def get_summary_fingerprint(self, tickerrefs=None, base_url=None):
+        if tickerrefs is None:
+            tickerrefs = list(self.tickerref_set.all())
+        if base_url is None:
+            base_url = overview_base_url()
+        h = hashlib.sha1(f'v{rendering.SUMMARY_RENDER_VERSION}'.encode())
+        # linked item hrefs start with the overview URL, which depends on the script prefix and
+        # language the rendering ran with (request vs. management command)
+        h.update(base_url.encode())
+        # the headline doesn't change the rendering but is part of the search document
+        h.update(self.headline.encode())
+        h.update((self.summary or '').encode())
         for ref in tickerrefs:
-            ref.is_in_summary = ref in ref_replaced_in_summary
-            ref.save(update_fields=('is_in_summary',))
-        self.refs_in_summary_count = len(ref_replaced_in_summary)
-        self.save(update_fields=('refs_in_summary_count',))
+            h.update(repr(ref.get_fingerprint_values()).encode())
+        return h.hexdigest()
 
-        return str(soup)
+    def get_rendered_summary(self):
+        return self._get_rendered_summary(list(self.tickerref_set.all()))
+
+    async def aget_rendered_summary(self):
+        # Same as get_rendered_summary(), refs that weren't prefetched are loaded with async iteration
+        prefetched = getattr(self, '_prefetched_objects_cache', {}).get('tickerref_set')
+        if prefetched is not None:
+            tickerrefs = list(prefetched)
+        else:
+            tickerrefs = [ref async for ref in self.tickerref_set.select_related('linked_tickeritem')]
+        return self._get_rendered_summary(tickerrefs)
+
+    def _get_rendered_summary(self, tickerrefs):
+        # Share link renderings carry the short code in linked item URLs and are not persisted
+        if self.short_link is None:
+            fingerprint = self.get_summary_fingerprint(tickerrefs)
+            if self.rendered_summary is not None and self.rendered_summary_fingerprint == fingerprint:
+                metrics.count('summary.stored')
+                return self.rendered_summary
+
+        # Stale or missing: render on the fly, persisting happens at write time (refresh_summary)
+        metrics.count('summary.on_the_fly', short_link=self.short_link is not None)
+        rendered, ref_replaced_in_summary = self.render_summary(tickerrefs, short_link=self.short_link)
+        return rendered
+
+    def refresh_summary(self, force=False):
+        # refs may have changed since they were prefetched
+        getattr(self, '_prefetched_objects_cache', {}).pop('tickerref_set', None)
+        return TickerItem.objects.refresh_summaries([self], force=force)
+
+    def render_summary(self, tickerrefs, short_link=None, url_builder=None):
+        specs = rendering.ref_specs(tickerrefs, short_link=short_link, url_builder=url_builder)
+        rendered, replaced = rendering.render(self.summary or '', specs)
+        return rendered, [tickerrefs[i] for i in replaced]
 
     def save(self, *args, **kwargs):
         super().save(*args, **kwargs)
@@ -182,6 +490,67 @@ class TickerItem(models.Model):
             if len(self.summary) > len('<p></p>'):
                 self.has_summary = True
         super().save(update_fields=('has_summary',))
+        refreshed = 0
+        if not _summary_refresh_deferred.get():
+            refreshed, refs_refreshed = self.refresh_summary()
+
+        # items linking here embed headline and pub_dt (TickerRef.get_ref_title/get_href)
+        link_values = self.get_link_values()
+        if self._loaded_link_values is not None and self._loaded_link_values != link_values:
+            TickerItem.objects.refresh_dependents([self.pk])
+        # the day the item moved away from changes as well
+        days = [self.pub_dt]
+        if self._loaded_link_values is not None:
+            days.append(self._loaded_link_values[1])
+        daycache.invalidate_days(daycache.local_date(dt) for dt in days if dt)
+        self._loaded_link_values = link_values
+
+        # refresh_summaries() already updated the digest of the new date/category
+        digest_keys = set()
+        if self._loaded_digest_key is not None:
+            digest_keys.add(self._loaded_digest_key)
+        if not refreshed:
+            digest_keys.add(digests.item_key(self))
+        elif self._loaded_digest_key == digests.item_key(self):
+            digest_keys = set()
+        digests.refresh_keys(digest_keys)
+        self._loaded_digest_key = digests.item_key(self)
+
+    def delete(self, *args, **kwargs):
+        dependent_ids = list(self.linked_tickerref_set.values_list('item_id', flat=True).distinct())
+        pub_dt = self.pub_dt
+        digest_key = digests.item_key(self)
+        result = super().delete(*args, **kwargs)
+        if pub_dt:
+            daycache.invalidate_days([daycache.local_date(pub_dt)])
+            digests.refresh_keys([digest_key])
+        if dependent_ids:
+            # their refs were set to NULL by the delete
+            TickerItem.objects.refresh_items(dependent_ids)
+        return result
+
+    _loaded_link_values = None
+    _loaded_digest_key = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if 'headline' in instance.__dict__ and 'pub_dt' in instance.__dict__:
+            instance._loaded_link_values = instance.get_link_values()
+        if 'pub_dt' in instance.__dict__ and 'category_id' in instance.__dict__:
+            instance._loaded_digest_key = digests.item_key(instance)
+        return instance
+
+    def get_link_values(self):
+        return self.headline, self.pub_dt
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['pub_dt', 'category'], name='newsticker_ti_pub_dt_cat_idx'),
+            models.Index(fields=['category', 'pub_dt'], name='newsticker_ti_cat_pub_dt_idx'),
+            # feed cursor (newsticker.feeds.visible_dt())
+            models.Index(Greatest('created_dt', 'pub_dt'), F('id'), name='newsticker_ti_visible_dt_idx'),
+        ]
 
     def get_absolute_url(self, short_link=None):
         # Todo: add single page
@@ -198,7 +567,7 @@ class TickerItem(models.Model):
         if short_link:
             params['s'] = short_link.short
         if collape_cat:
-            params['collapse_cat'] = str(self.category.pk)
+            params['collapse_cat'] = str(self.category_id)
 
         get_params = urlencode(params)
 
@@ -231,6 +600,54 @@ class TickerRef(models.Model):
     is_in_summary = models.BooleanField(default=False, editable=False)
     objects = TickerRefManager()
 
+    def get_fingerprint_values(self):
+        return (
+            self.pk,
+            self.ref_type,
+            self.index,
+            self.url,
+            self.uploadfile.name if self.uploadfile else None,
+            self.linked_tickeritem_id,
+            self.linked_tickeritem.get_link_values() if self.linked_tickeritem_id else None,
+            self.title,
+            self.text,
+        )
+
+    _loaded_uploadfile = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if 'uploadfile' in instance.__dict__:
+            instance._loaded_uploadfile = instance.uploadfile.name or None
+        else:
+            instance._loaded_uploadfile = models.DEFERRED
+        return instance
+
+    def save(self, *args, **kwargs):
+        if self._loaded_uploadfile is models.DEFERRED:
+            # loaded without uploadfile, the reference counts need the stored name
+            self._loaded_uploadfile = TickerRef.objects.filter(pk=self.pk).values_list('uploadfile', flat=True).first() or None
+        if self.uploadfile and filestore.is_enabled():
+            # same content, same file (newsticker.filestore), instead of upload_to
+            self.uploadfile.name = filestore.adopt(self.uploadfile, self._loaded_uploadfile)
+            self.uploadfile._committed = True
+        super().save(*args, **kwargs)
+        uploadfile = self.uploadfile.name or None
+        if uploadfile != self._loaded_uploadfile:
+            filestore.acquire(uploadfile)
+            filestore.release(self._loaded_uploadfile)
+            self._loaded_uploadfile = uploadfile
+        if not _summary_refresh_deferred.get():
+            self.item.refresh_summary()
+
+    def delete(self, *args, **kwargs):
+        item = self.item
+        result = super().delete(*args, **kwargs)
+        if not _summary_refresh_deferred.get():
+            item.refresh_summary()
+        return result
+
     def get_is_local(self):
         if self.url:
             if self.url.startswith('http'):
@@ -294,8 +711,139 @@ class TickerRef(models.Model):
         ordering = ['item', 'index']
 
 
+SHORT_ALPHABET = string.ascii_uppercase + string.ascii_lowercase + string.digits
+SHORT_MAX_ATTEMPTS = 10
+
+
+def encode_short_pk(pk, size):
+    # Bijective mapping of pk onto the keyspace, scrambled so consecutive links don't get similar codes
+    keyspace = len(SHORT_ALPHABET) ** size
+    if pk >= keyspace:
+        raise ValueError(f'pk {pk} exceeds the short code keyspace')
+    n = (pk * 1580030173 + 104729) % keyspace  # multiplier is coprime to 62 ** size
+    chars = []
+    for _ in range(size):
+        n, rem = divmod(n, len(SHORT_ALPHABET))
+        chars.append(SHORT_ALPHABET[rem])
+    return ''.join(chars)
+
+
+class TickerItemSearchDocument(models.Model):
+    # Plain text of an item, maintained by TickerItemManager.refresh_summaries(). The database
+    # specific index (PostgreSQL tsvector/GIN, SQLite FTS5) is added by migration 0017.
+    item = models.OneToOneField(TickerItem, on_delete=models.CASCADE, primary_key=True, related_name='search_document')
+    text = models.TextField(blank=True, default='')
+
+    def __str__(self):
+        return str(self.item_id)
+
+
+class TickerDayDigest(models.Model):
+    # Items of one local date and category in overview order, maintained by newsticker.digests
+    # on item saves/deletes and summary refreshes, rebuilt by newsticker_rebuild_digests
+    date = models.DateField()
+    category = models.ForeignKey(TickerCategory, on_delete=models.CASCADE)
+    item_ids = models.JSONField(default=list)
+    item_count = models.IntegerField(default=0)
+    last_modified = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'category'], name='newsticker_digest_date_cat_uniq'),
+        ]
+
+    def __str__(self):
+        return f'{self.date} {self.category_id}'
+
+
+class TickerItemArchive(models.Model):
+    # Archived TickerItem (same id) with its refs as JSON, written by newsticker.archive
+    id = models.IntegerField(primary_key=True)
+    pub_dt = models.DateTimeField(db_index=True)
+    category_id = models.IntegerField(null=True)
+    headline = models.CharField(max_length=255)
+    external_id = models.CharField(max_length=255, null=True, blank=True)
+    archived_dt = models.DateTimeField(auto_now_add=True)
+    data = models.JSONField()
+
+    def __str__(self):
+        return self.headline
+
+
+# releases content addressed uploads, also for refs deleted by a cascade
+post_delete.connect(filestore.ref_deleted, sender=TickerRef, dispatch_uid='newsticker_tickerref_uploadfile')
+
+
+class StoredFile(models.Model):
+    # One content addressed upload (newsticker.filestore), refcount counts the TickerRefs and
+    # archived refs using it
+    name = models.CharField(max_length=255, unique=True)
+    sha256 = models.CharField(max_length=64, db_index=True)
+    size = models.BigIntegerField()
+    original_name = models.CharField(max_length=255, blank=True, default='')
+    refcount = models.IntegerField(default=0)
+    created_dt = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.original_name or self.name
+
+
+def sharelink_cache_key(short):
+    return f'newsticker:sharelink:{short}'
+
+
+class ResolvedShareLink(namedtuple('ResolvedShareLink', [
+        'pk', 'short', 'valid_until', 'display_date', 'display_days', 'url', 'short_link_url'])):
+    # Cacheable stand-in for a ShareLink on the share path, see ShareLinkManager.resolve()
+    __slots__ = ()
+
+    def is_valid(self):
+        return self.valid_until >= timezone.now()
+
+    def resolve_url(self):
+        return self.url
+
+    def get_short_link_url(self):
+        return self.short_link_url
+
+    def add_request(self, request):
+        ShareLink.record_click(self.pk, request)
+
+    def __str__(self):
+        return self.short
+
+
+class ShareLinkManager(models.Manager):
+    def resolve(self, short):
+        # Returns a ResolvedShareLink (also for expired links, check is_valid()) or None for unknown codes
+        start = time.perf_counter()
+        cache = caching.get_cache()
+        key = sharelink_cache_key(short)
+        cached = cache.get(key)
+        if cached is not None:
+            metrics.timing('sharelink.resolve', time.perf_counter() - start, cached=True)
+            return ResolvedShareLink(*cached) if cached else None
+
+        negative_ttl = getattr(settings, 'NEWSTICKER_SHARELINK_NEGATIVE_CACHE_TTL', 60)
+        sharelink = self.filter(short=short).first()
+        if sharelink is None:
+            cache.set(key, (), negative_ttl)
+            metrics.timing('sharelink.resolve', time.perf_counter() - start, cached=False)
+            return None
+
+        resolved = sharelink.get_resolved()
+        # valid links are cached until they expire at the latest
+        ttl = min(
+            getattr(settings, 'NEWSTICKER_SHARELINK_CACHE_TTL', 3600),
+            int((sharelink.valid_until - timezone.now()).total_seconds())
+        )
+        cache.set(key, tuple(resolved), ttl if ttl > 0 else negative_ttl)
+        metrics.timing('sharelink.resolve', time.perf_counter() - start, cached=False)
+        return resolved
+
+
 class ShareLink(models.Model):
-    short = models.CharField(max_length=5, editable=False)
+    short = models.CharField(max_length=5, editable=False, unique=True, null=True)
     valid_until = models.DateTimeField()
     shared_with_notes = models.CharField(max_length=255, null=True, blank=True)
 
@@ -304,40 +852,74 @@ class ShareLink(models.Model):
     display_date = models.DateField()
     display_days = models.IntegerField(default=0)
 
-    clicks_log = models.TextField(null=True, blank=True)
     clicks_counter = models.IntegerField(default=0)
+    objects = ShareLinkManager()
 
     @staticmethod
     def generate_short_id(size):
-        return ''.join(random.choices(string.ascii_uppercase + string.ascii_lowercase + string.digits, k=size))
+        return ''.join(random.choices(SHORT_ALPHABET, k=size))
 
     def get_default_short_size(self):
         return self._meta.get_field('short').max_length
 
     def save(self, *args, **kwargs):
-        if not self.short:
-            size = self.get_default_short_size()
-            short = self.generate_short_id(size=size)
-            if ShareLink.objects.filter(short=short).exists():
-                return self.save(*args, **kwargs)
-            self.short = short
-        return super(ShareLink, self).save(*args, **kwargs)
+        # 'random': insert a random code and retry on collision, 'pk': encode the pk after the insert
+        strategy = getattr(settings, 'NEWSTICKER_SHARELINK_SHORT_STRATEGY', 'random')
+        if self.short:
+            super(ShareLink, self).save(*args, **kwargs)
+        elif strategy == 'pk' and self.pk is None:
+            with transaction.atomic():
+                super(ShareLink, self).save(*args, **kwargs)
+                self.short = encode_short_pk(self.pk, size=self.get_default_short_size())
+                try:
+                    with transaction.atomic():
+                        super(ShareLink, self).save(update_fields=['short'])
+                except IntegrityError:
+                    # taken by a random code from before switching strategies
+                    self.save_with_random_short(update_fields=['short'])
+        else:
+            self.save_with_random_short(*args, **kwargs)
+
+    def save_with_random_short(self, *args, **kwargs):
+        size = self.get_default_short_size()
+        for attempt in range(SHORT_MAX_ATTEMPTS):
+            self.short = self.generate_short_id(size=size)
+            try:
+                with transaction.atomic():
+                    return super(ShareLink, self).save(*args, **kwargs)
+            except IntegrityError:
+                if attempt == SHORT_MAX_ATTEMPTS - 1:
+                    self.short = None
+                    raise
 
     def is_valid(self):
         return self.valid_until >= timezone.now()
 
+    @staticmethod
+    def record_click(sharelink_id, request):
+        buffered = clicks.is_buffered()
+        with metrics.timer('sharelink.click', buffered=buffered):
+            click = ShareLinkClick.from_request(request, sharelink_id)
+            if buffered:
+                clicks.get_recorder().record(click)
+            else:
+                click.save()
+                ShareLink.objects.filter(pk=sharelink_id).update(clicks_counter=F('clicks_counter') + 1)
+
     def add_request(self, request):
-        local_dt = timezone.localtime(timezone.now(), timezone=timezone.get_current_timezone())
-        dt_str = local_dt.strftime("%Y-%m-%d;%H:%M:%S")
-        user_agent = request.headers["user-agent"]
-        content_params = request.content_params
-        user_name = request.user.get_username()
-        log_line = f'{dt_str};{user_name};{user_agent};{content_params}\n'
-        logs = self.clicks_log or ''
-        logs += log_line
-        self.clicks_log = logs
+        self.record_click(self.pk, request)
         self.clicks_counter += 1
-        self.save(update_fields=['clicks_log', 'clicks_counter'])
+
+    def get_resolved(self):
+        return ResolvedShareLink(
+            pk=self.pk,
+            short=self.short,
+            valid_until=self.valid_until,
+            display_date=self.display_date,
+            display_days=self.display_days,
+            url=self.resolve_url(),
+            short_link_url=self.get_short_link_url(),
+        )
 
     def resolve_url(self, view_name='gruene_cms_news:newsticker_index'):
         base_url = reverse(view_name)
@@ -354,6 +936,40 @@ class ShareLink(models.Model):
         return reverse(view_name, kwargs={'short': self.short})
 
     def __str__(self):
-        return self.short
+        return self.short or ''
+
+
+class ShareLinkClick(models.Model):
+    sharelink = models.ForeignKey(ShareLink, on_delete=models.CASCADE, related_name='clicks')
+    ts = models.DateTimeField(default=timezone.now)
+    user_name = models.CharField(max_length=150, blank=True, default='')
+    user_agent = models.TextField(blank=True, default='')
+    content_params = models.CharField(max_length=255, blank=True, default='')
+
+    @classmethod
+    def from_request(cls, request, sharelink_id):
+        return cls(
+            sharelink_id=sharelink_id,
+            user_name=request.user.get_username(),
+            user_agent=request.headers.get('user-agent', ''),
+            content_params=str(request.content_params)[:255],
+        )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['sharelink', 'ts'], name='newsticker_slc_link_ts_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.sharelink} {self.ts}'
+
+
+def sharelink_changed(sender, instance, **kwargs):
+    # post_save/post_delete of ShareLink, so queryset deletes (admin actions, purges) drop the
+    # cached resolution too
+    if instance.short:
+        caching.get_cache().delete(sharelink_cache_key(instance.short))
 
 
+post_save.connect(sharelink_changed, sender=ShareLink, dispatch_uid='newsticker_sharelink_cache')
+post_delete.connect(sharelink_changed, sender=ShareLink, dispatch_uid='newsticker_sharelink_cache')
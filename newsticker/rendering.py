@@ -0,0 +1,365 @@
+import re
+from collections import namedtuple
+from html.entities import name2codepoint
+from html.parser import HTMLParser
+
+from bs4 import BeautifulSoup
+from django.conf import settings
+
+from . import metrics
+from .urlbuilder import OverviewUrlBuilder
+
+
+# Bump when the markup produced here changes (e.g. new ref_type icons), so persisted summaries get rebuilt
+SUMMARY_RENDER_VERSION = 1
+
+REF_TYPE_ICON = {
+    'website': 'fa ms-1 fa-globe',
+    'pdf': 'fa ms-1 fa-file-pdf',
+    'video': 'fa ms-1 fa-video',
+    'image': 'fa ms-1 fa-image',
+    'tickeritem': 'fa ms-1 fa-link'
+}
+
+# Everything the renderer needs from a TickerRef, plain data so it can be pickled to worker processes
+RefSpec = namedtuple('RefSpec', ['ref_type', 'href', 'title', 'ref_title', 'text', 'is_local'])
+
+
+def ref_specs(tickerrefs, short_link=None, url_builder=None):
+    if url_builder is None:
+        url_builder = OverviewUrlBuilder()
+    return [
+        RefSpec(
+            ref_type=ref.ref_type,
+            href=url_builder.ref_href(ref, short_link=short_link),
+            title=ref.title,
+            ref_title=ref.get_ref_title(),
+            text=ref.text,
+            is_local=ref.get_is_local(),
+        )
+        for ref in tickerrefs
+    ]
+
+
+def get_engine():
+    return getattr(settings, 'NEWSTICKER_SUMMARY_RENDERER', 'fast')
+
+
+def render(summary, specs, engine=None):
+    # Returns (html, indexes of the specs replaced in the summary)
+    if engine is None:
+        engine = get_engine()
+    if engine == 'fast':
+        try:
+            with metrics.timer('summary.render', engine='fast'):
+                return render_fast(summary, specs)
+        except FastRenderUnsupported:
+            metrics.count('summary.fast_fallback')
+    with metrics.timer('summary.render', engine='soup'):
+        return render_soup(summary, specs)
+
+
+def render_job(job):
+    # Picklable entry point for worker processes, job is (summary, specs, engine)
+    summary, specs, engine = job
+    return render(summary, specs, engine=engine)
+
+
+def render_soup(summary, specs):
+    with metrics.timer('summary.parse', engine='soup'):
+        soup = BeautifulSoup(summary, 'html.parser')
+    marker_tags = soup.find_all("span", {'class': "marker"})
+    metrics.count('summary.markers', len(marker_tags))
+    metrics.count('summary.refs', len(specs))
+
+    ref_replaced_in_summary = []
+
+    for i, marker_tag in enumerate(marker_tags):
+        try:
+            ref = specs[i]
+        except IndexError:
+            ref = None
+        if ref:
+            href = ref.href
+            ref_text = ref.text
+            ref_title = ref.title
+            if href:
+                ref_title = ref.ref_title
+                target = ''
+                if not ref.is_local:
+                    target = '_blank'
+                # create Tags
+                a_tag = soup.new_tag('a', attrs={'href': href, 'title': ref_title, 'data-ref-type': ref.ref_type, 'target': target})
+                sup_tag = soup.new_tag('sup', attrs={'class': 'mx-1'})
+                fa_icon_tag = soup.new_tag('i', attrs={'class': REF_TYPE_ICON[ref.ref_type]})
+
+                if '^' in marker_tag.string:
+                    a_tag.string = ''
+                else:
+                    a_tag.string = marker_tag.string
+                # sup-Tag ID
+                #sup_tag.string = str(ref.pk) + ""
+                sup_tag.string = ""
+                # i-Tag
+                sup_tag.append(fa_icon_tag)
+                a_tag.append(sup_tag)
+
+                marker_tag.replace_with(a_tag)
+                ref_replaced_in_summary.append(i)
+
+            if ref_text and ref.ref_type == 'abbreviation':
+                abbr_tag = soup.new_tag('abbr', attrs={
+                    'title': ref_text,
+                    #'class': 'initialism'
+                })
+                if ref_title:
+                    abbr_tag.string = ref_title
+                else:
+                    abbr_tag.string = marker_tag.string
+                hidden_tag = soup.new_tag('span', attrs={'class': 'd-none hidden-abbr'})
+                hidden_tag.string = f' ({ref_text})'
+                abbr_tag.append(hidden_tag)
+                marker_tag.replace_with(abbr_tag)
+                ref_replaced_in_summary.append(i)
+
+    return str(soup), ref_replaced_in_summary
+
+
+class FastRenderUnsupported(Exception):
+    pass
+
+
+# Serialisation rules of BeautifulSoup (html.parser builder, "minimal" formatter)
+VOID_TAGS = {
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'param', 'source', 'track', 'wbr'
+}
+RAW_TEXT_TAGS = {
+    'script', 'style', 'textarea', 'title', 'xmp', 'iframe', 'noembed', 'noframes', 'noscript', 'plaintext', 'pre'
+}
+ASCII_SPACES = '\x20\x0a\x09\x0c\x0d'
+LIST_ATTRIBUTES = {
+    '*': {'class', 'accesskey', 'dropzone'},
+    'a': {'rel', 'rev'},
+    'link': {'rel', 'rev'},
+    'td': {'headers'},
+    'th': {'headers'},
+    'form': {'accept-charset'},
+    'object': {'archive'},
+    'area': {'rel'},
+    'icon': {'sizes'},
+    'iframe': {'sandbox'},
+    'output': {'for'},
+}
+_nonwhitespace_re = re.compile(r'\S+')
+
+
+def _collapse_whitespace(text):
+    # whitespace-only strings are reduced to a single newline or space
+    if not text.strip(ASCII_SPACES):
+        return '\n' if '\n' in text else ' '
+    return text
+
+
+def _escape(text):
+    return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+
+def _quote_attr(value):
+    value = _escape(value)
+    quote_with = '"'
+    if '"' in value:
+        if "'" in value:
+            value = value.replace('"', '&quot;')
+        else:
+            quote_with = "'"
+    return quote_with + value + quote_with
+
+
+def _format_tag(tag, attrs):
+    parts = [f'<{tag}']
+    for key, value in sorted(attrs, key=lambda kv: kv[0]):
+        parts.append(f' {key}={_quote_attr(value)}')
+    return ''.join(parts)
+
+
+class _MarkerRewriter(HTMLParser):
+    def __init__(self, specs):
+        super().__init__(convert_charrefs=False)
+        self.specs = specs
+        self.out = []
+        self.stack = []
+        self.text = []
+        self.marker_attrs = None
+        self.marker_text = None
+        self.marker_index = 0
+        self.replaced = []
+
+    def flush_text(self):
+        if not self.text:
+            return
+        text = _collapse_whitespace(''.join(self.text))
+        self.text = []
+        if self.marker_text is not None:
+            self.marker_text.append(text)
+        else:
+            self.out.append(_escape(text))
+
+    def _normalize_attrs(self, tag, attrs):
+        list_attributes = LIST_ATTRIBUTES['*'] | LIST_ATTRIBUTES.get(tag, set())
+        seen = set()
+        normalized = []
+        for key, value in attrs:
+            if key in seen:
+                raise FastRenderUnsupported('duplicate attribute')
+            seen.add(key)
+            if value is None:
+                value = ''
+            elif key in list_attributes:
+                value = ' '.join(_nonwhitespace_re.findall(value))
+            normalized.append((key, value))
+        return normalized
+
+    def handle_starttag(self, tag, attrs):
+        self.flush_text()
+        if self.marker_text is not None:
+            raise FastRenderUnsupported('markup inside marker')
+        if tag in RAW_TEXT_TAGS:
+            raise FastRenderUnsupported(f'<{tag}>')
+        attrs = self._normalize_attrs(tag, attrs)
+        if tag in VOID_TAGS:
+            self.out.append(_format_tag(tag, attrs) + '/>')
+            return
+        self.stack.append(tag)
+        if tag == 'span' and 'marker' in dict(attrs).get('class', '').split(' '):
+            self.marker_attrs = attrs
+            self.marker_text = []
+            return
+        self.out.append(_format_tag(tag, attrs) + '>')
+
+    def handle_startendtag(self, tag, attrs):
+        if tag not in VOID_TAGS:
+            raise FastRenderUnsupported(f'<{tag}/>')
+        self.handle_starttag(tag, attrs)
+
+    def handle_endtag(self, tag):
+        self.flush_text()
+        if tag in VOID_TAGS or not self.stack or self.stack[-1] != tag:
+            raise FastRenderUnsupported(f'unbalanced </{tag}>')
+        self.stack.pop()
+        if self.marker_text is not None:
+            self.out.append(self._render_marker(''.join(self.marker_text)))
+            self.marker_attrs = self.marker_text = None
+            return
+        self.out.append(f'</{tag}>')
+
+    def handle_data(self, data):
+        self.text.append(data)
+
+    def handle_entityref(self, name):
+        if name not in name2codepoint:
+            raise FastRenderUnsupported(f'&{name};')
+        self.handle_data(chr(name2codepoint[name]))
+
+    def handle_charref(self, name):
+        try:
+            if name[:1] in ('x', 'X'):
+                codepoint = int(name[1:], 16)
+            else:
+                codepoint = int(name)
+        except ValueError:
+            raise FastRenderUnsupported(f'&#{name};')
+        if not (codepoint in (9, 10) or 32 <= codepoint < 127 or 160 <= codepoint < 0xd800 or 0xe000 <= codepoint < 0x110000):
+            raise FastRenderUnsupported(f'&#{name};')
+        self.handle_data(chr(codepoint))
+
+    def handle_comment(self, data):
+        self.flush_text()
+        if self.marker_text is not None:
+            raise FastRenderUnsupported('comment inside marker')
+        # soup collapses whitespace-only comments like any other string
+        self.out.append(f'<!--{_collapse_whitespace(data)}-->')
+
+    def handle_decl(self, decl):
+        raise FastRenderUnsupported('declaration')
+
+    def handle_pi(self, data):
+        raise FastRenderUnsupported('processing instruction')
+
+    def unknown_decl(self, data):
+        raise FastRenderUnsupported('declaration')
+
+    def _render_marker(self, marker_string):
+        if not marker_string:
+            # BeautifulSoup sees marker_tag.string as None here
+            raise FastRenderUnsupported('empty marker')
+        i = self.marker_index
+        self.marker_index += 1
+        ref = self.specs[i] if i < len(self.specs) else None
+
+        if ref and ref.href:
+            if ref.ref_type not in REF_TYPE_ICON or (ref.text and ref.ref_type == 'abbreviation'):
+                # error cases of the soup renderer, let it raise
+                raise FastRenderUnsupported('unsupported ref')
+            target = '' if ref.is_local else '_blank'
+            a_attrs = [('href', ref.href), ('title', ref.ref_title), ('data-ref-type', ref.ref_type), ('target', target)]
+            a_string = '' if '^' in marker_string else _escape(marker_string)
+            self.replaced.append(i)
+            return (
+                _format_tag('a', a_attrs) + '>' + a_string
+                + '<sup class="mx-1">' + _format_tag('i', [('class', REF_TYPE_ICON[ref.ref_type])]) + '></i></sup></a>'
+            )
+
+        if ref and ref.text and ref.ref_type == 'abbreviation':
+            abbr_string = ref.title if ref.title else marker_string
+            self.replaced.append(i)
+            return (
+                _format_tag('abbr', [('title', ref.text)]) + '>' + _escape(abbr_string)
+                + '<span class="d-none hidden-abbr">' + _escape(f' ({ref.text})') + '</span></abbr>'
+            )
+
+        return _format_tag('span', self.marker_attrs) + '>' + _escape(marker_string) + '</span>'
+
+
+def render_fast(summary, specs):
+    # Byte-identical to render_soup() for well-formed summaries, raises FastRenderUnsupported otherwise
+    parser = _MarkerRewriter(specs)
+    parser.feed(summary)
+    parser.close()
+    parser.flush_text()
+    if parser.stack or parser.marker_text is not None:
+        raise FastRenderUnsupported('unclosed tags')
+    # parsing and rewriting are one pass here, summary.render covers both
+    metrics.count('summary.markers', parser.marker_index)
+    metrics.count('summary.refs', len(specs))
+    return ''.join(parser.out), parser.replaced
+
+
+class _TextExtractor(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self.marker_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        self.parts.append(' ')
+        if tag == 'span' and (self.marker_depth or 'marker' in (dict(attrs).get('class') or '').split()):
+            self.marker_depth += 1
+
+    def handle_endtag(self, tag):
+        self.parts.append(' ')
+        if self.marker_depth and tag == 'span':
+            self.marker_depth -= 1
+
+    def handle_data(self, data):
+        # "^" markers are placeholders for an icon-only link
+        if self.marker_depth and data.strip() == '^':
+            return
+        self.parts.append(data)
+
+
+def plain_text(summary):
+    # summary without markup, used for the search index
+    parser = _TextExtractor()
+    parser.feed(summary or '')
+    parser.close()
+    return ' '.join(''.join(parser.parts).split())
@@ -0,0 +1,105 @@
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from . import rendering
+
+
+def get_search_config():
+    return getattr(settings, 'NEWSTICKER_SEARCH_CONFIG', 'german')
+
+
+def document_text(item, tickerrefs):
+    # headline, summary without markup and the ref titles/texts
+    parts = [item.headline, rendering.plain_text(item.summary)]
+    for ref in tickerrefs:
+        if ref.title:
+            parts.append(ref.title)
+        if ref.text:
+            parts.append(ref.text)
+    return ' '.join(part for part in parts if part)
+
+
+def query_terms(query):
+    return query.split()
+
+
+class SearchBackend:
+    def filter(self, qs, query):
+        raise NotImplementedError
+
+
+class BasicSearchBackend(SearchBackend):
+    # Every term has to appear in the plain text document, still a scan but over a narrow table
+    def filter(self, qs, query):
+        for term in query_terms(query):
+            qs = qs.filter(search_document__text__icontains=term)
+        return qs
+
+
+class PostgresSearchBackend(SearchBackend):
+    # search_vector column, GIN index and trigger are created by migration 0017
+    def filter(self, qs, query):
+        return qs.filter(pk__in=RawSQL(
+            'SELECT item_id FROM newsticker_tickeritemsearchdocument '
+            'WHERE search_vector @@ websearch_to_tsquery(%s::regconfig, %s)',
+            [get_search_config(), query]
+        ))
+
+
+class SqliteSearchBackend(SearchBackend):
+    # FTS5 table over the document table, kept in sync by triggers from migration 0017
+    def filter(self, qs, query):
+        terms = query_terms(query)
+        if not terms:
+            return qs
+        # every term as quoted prefix search, AND-ed
+        match = ' '.join('"{}"*'.format(term.replace('"', '""')) for term in terms)
+        return qs.filter(pk__in=RawSQL(
+            'SELECT rowid FROM newsticker_tickeritem_fts WHERE newsticker_tickeritem_fts MATCH %s',
+            [match]
+        ))
+
+
+BACKENDS = {
+    'basic': BasicSearchBackend,
+    'postgresql': PostgresSearchBackend,
+    'sqlite': SqliteSearchBackend,
+}
+
+
+def sqlite_has_fts5():
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT count(*) FROM sqlite_master WHERE name = 'newsticker_tickeritem_fts'")
+        return cursor.fetchone()[0] > 0
+
+
+_backend = None
+
+
+def get_backend():
+    # NEWSTICKER_SEARCH_BACKEND: 'auto' (default), 'postgresql', 'sqlite' or 'basic'
+    global _backend
+    if _backend is None:
+        name = getattr(settings, 'NEWSTICKER_SEARCH_BACKEND', 'auto')
+        if name == 'auto':
+            name = connection.vendor
+            if name == 'sqlite' and not sqlite_has_fts5():
+                name = 'basic'
+        _backend = BACKENDS.get(name, BasicSearchBackend)()
+    return _backend
+
+
+def search(qs, query):
+    query = query.strip()
+    if not query:
+        return qs
+    return get_backend().filter(qs, query)
+
+
+def legacy_filter(qs, query):
+    # what TickerItemAdmin.search_fields did, kept for comparison
+    for term in query_terms(query):
+        qs = qs.filter(Q(headline__icontains=term) | Q(summary__icontains=term))
+    return qs
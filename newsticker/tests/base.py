@@ -0,0 +1,37 @@
+import datetime
+import shutil
+import tempfile
+
+from django.test import TestCase, override_settings
+
+from newsticker import caching
+from newsticker.benchmarks.generator import generate
+
+
+# window date of the generated data, fixed so the tests don't depend on today
+REF_DATE = datetime.date(2026, 3, 16)
+
+
+class NewstickerTestCase(TestCase):
+    # setUp() generates a seeded dataset (self.dataset) when seed is set, see generate_data()
+    seed = None
+    items = 20
+    generate_params = {}
+
+    def setUp(self):
+        caching.get_cache().clear()
+        if self.seed is not None:
+            self.dataset = self.generate_data(self.seed, self.items, **self.generate_params)
+
+    def generate_data(self, seed, items, **params):
+        params.setdefault('days', 3)
+        params.setdefault('sharelinks', 0)
+        params.setdefault('ref_date', REF_DATE)
+        return generate(seed=seed, items=items, **params)
+
+    def use_temp_media_root(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
@@ -0,0 +1,26 @@
+# Settings for the newsticker test suite:
+#   django-admin test newsticker.tests --settings=newsticker.tests.settings
+# or python -m pytest (see conftest.py)
+SECRET_KEY = 'newsticker-tests'
+INSTALLED_APPS = [
+    'django.contrib.contenttypes',
+    'django.contrib.auth',
+    'treebeard',
+    'newsticker',
+]
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+    },
+}
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+USE_TZ = True
+TIME_ZONE = 'Europe/Berlin'
+ROOT_URLCONF = 'newsticker.tests.urls'
+DEFAULT_AUTO_FIELD = 'django.db.models.AutoField'
+MEDIA_URL = '/media/'
@@ -0,0 +1,103 @@
+import datetime
+from io import StringIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.utils import timezone
+
+from newsticker import archive, caching
+from newsticker.models import (
+    ShareLink, TickerItem, TickerItemArchive, TickerRef, local_day_start, sharelink_cache_key,
+)
+
+from .base import REF_DATE, NewstickerTestCase
+
+
+class ArchiveTest(NewstickerTestCase):
+    seed = 7
+    items = 30
+    generate_params = {'days': 10}
+
+    def setUp(self):
+        self.use_temp_media_root()
+        super().setUp()
+        self.cutoff = local_day_start(REF_DATE - datetime.timedelta(days=5))
+        self.old = list(TickerItem.objects.filter(pub_dt__lt=self.cutoff).order_by('pk'))
+        self.hot = list(TickerItem.objects.filter(pub_dt__gte=self.cutoff).order_by('pk'))
+        self.assertTrue(len(self.old) > 3 and self.hot)
+
+    def add_upload(self, item, name, content):
+        # an upload_to file as saved before content addressed storage
+        name = default_storage.save(name, ContentFile(content))
+        ref = TickerRef.objects.create(item=item, ref_type='pdf', index=99)
+        TickerRef.objects.filter(pk=ref.pk).update(uploadfile=name)
+        return name
+
+    def test_archive_rows(self):
+        item = TickerItem.objects.with_relations().get(pk=self.old[0].pk)
+        refs = list(item.tickerref_set.all())
+        items, refs_count, files, protected = archive.archive_items(self.cutoff)
+        self.assertEqual((items, protected), (len(self.old), 0))
+        self.assertFalse(TickerItem.objects.filter(pub_dt__lt=self.cutoff).exists())
+        self.assertEqual(TickerItem.objects.count(), len(self.hot))
+
+        archived = TickerItemArchive.objects.get(pk=item.pk)
+        self.assertEqual((archived.headline, archived.pub_dt, archived.category_id),
+                         (item.headline, item.pub_dt, item.category_id))
+        self.assertEqual(archived.data['category']['name'], item.category.name)
+        self.assertEqual(archived.data['publication']['id'], item.publication_id)
+        self.assertEqual(archived.data['rendered_summary'], item.rendered_summary)
+        self.assertEqual([ref['id'] for ref in archived.data['refs']], [ref.pk for ref in refs])
+        self.assertEqual([ref['url'] for ref in archived.data['refs']], [ref.url for ref in refs])
+
+    def test_link_targets_stay_hot(self):
+        target, linked = self.old[0], self.old[1]
+        TickerRef.objects.create(item=self.hot[0], ref_type='tickeritem', index=99, linked_tickeritem=target)
+        # linked from the protected item, so protected too
+        TickerRef.objects.create(item=target, ref_type='tickeritem', index=99, linked_tickeritem=linked)
+        items, refs, files, protected = archive.archive_items(self.cutoff)
+        self.assertEqual((items, protected), (len(self.old) - 2, 2))
+        self.assertEqual(set(TickerItem.objects.filter(pub_dt__lt=self.cutoff).values_list('pk', flat=True)),
+                         {target.pk, linked.pk})
+        self.assertEqual(TickerRef.objects.get(item=self.hot[0], index=99).linked_tickeritem_id, target.pk)
+
+    def test_shared_upload_stays_in_place(self):
+        shared = self.add_upload(self.old[0], 'newsticker/files/1/press.pdf', b'%PDF shared')
+        TickerRef.objects.create(item=self.hot[0], ref_type='pdf', index=99)
+        TickerRef.objects.filter(item=self.hot[0], index=99).update(uploadfile=shared)
+        own = self.add_upload(self.old[1], 'newsticker/files/2/own.pdf', b'%PDF own')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            items, refs, files, protected = archive.archive_items(self.cutoff)
+        self.assertEqual(files, 1)
+        self.assertTrue(default_storage.exists(shared))
+        self.assertFalse(default_storage.exists(own))
+        self.assertTrue(default_storage.exists(archive.archived_path(own)))
+        uploads = {
+            ref['uploadfile']
+            for data in TickerItemArchive.objects.values_list('data', flat=True) for ref in data['refs']
+        }
+        self.assertLessEqual({shared, archive.archived_path(own)}, uploads)
+
+    def test_dry_run(self):
+        out = StringIO()
+        call_command('newsticker_archive', older_than_days=(timezone.localdate() - REF_DATE).days + 5,
+                     dry_run=True, stdout=out)
+        self.assertIn('would be archived', out.getvalue())
+        self.assertEqual(archive.archive_items(self.cutoff, dry_run=True), (len(self.old), 0, 0, 0))
+        self.assertEqual(TickerItem.objects.count(), len(self.old) + len(self.hot))
+        self.assertFalse(TickerItemArchive.objects.exists())
+
+    def test_purge_sharelinks_drops_cache_entries(self):
+        now = timezone.now()
+        expired = ShareLink(valid_until=now - datetime.timedelta(days=100), display_date=REF_DATE)
+        expired.save()
+        valid = ShareLink(valid_until=now + datetime.timedelta(days=1), display_date=REF_DATE)
+        valid.save()
+        self.assertIsNotNone(ShareLink.objects.resolve(expired.short))
+        self.assertEqual(archive.purge_sharelinks(now - datetime.timedelta(days=90), dry_run=True), 1)
+        self.assertEqual(archive.purge_sharelinks(now - datetime.timedelta(days=90)), 1)
+        self.assertIsNone(caching.get_cache().get(sharelink_cache_key(expired.short)))
+        self.assertIsNone(ShareLink.objects.resolve(expired.short))
+        self.assertEqual(list(ShareLink.objects.values_list('pk', flat=True)), [valid.pk])
@@ -0,0 +1,45 @@
+from asgiref.sync import sync_to_async
+
+from newsticker.models import TickerCategory, TickerItem
+
+from .base import REF_DATE, NewstickerTestCase
+
+
+class AsyncOverviewTest(NewstickerTestCase):
+    seed = 1
+    items = 60
+
+    def setUp(self):
+        super().setUp()
+        self.category_ids = self.dataset.category_ids[:2]
+
+    def categories_qs(self):
+        return TickerCategory.objects.filter(pk__in=self.category_ids)
+
+    async def test_acurrent_with_categories_qs(self):
+        items = await TickerItem.objects.acurrent(ref_date=REF_DATE, limit_days=2, limit_categories_qs=self.categories_qs())
+        expected = await sync_to_async(list)(TickerItem.objects.current(
+            ref_date=REF_DATE, limit_days=2, limit_categories_qs=self.categories_qs()
+        ).values_list('pk', flat=True))
+        self.assertTrue(expected)
+        self.assertEqual([item.pk for item in items], expected)
+        self.assertLessEqual({item.category_id for item in items}, set(self.category_ids))
+
+    async def test_aiter_by_date_with_categories_qs(self):
+        groups = [
+            (date, category.pk, [item.pk for item in items])
+            async for date, category, items in TickerItem.objects.aiter_by_date(
+                ref_date=REF_DATE, limit_days=2, limit_categories_qs=self.categories_qs()
+            )
+        ]
+        by_date = await sync_to_async(TickerItem.objects.current_by_date)(
+            ref_date=REF_DATE, limit_days=2, limit_categories_qs=self.categories_qs()
+        )
+        expected = [
+            (date, category.pk, [item.pk for item in items])
+            for date, categories in by_date.items()
+            for category, items in categories.items()
+        ]
+        self.assertTrue(expected)
+        self.assertEqual(groups, expected)
+        self.assertLessEqual({category_id for date, category_id, pks in groups}, set(self.category_ids))
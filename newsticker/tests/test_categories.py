@@ -0,0 +1,35 @@
+import time
+from unittest import mock
+
+from django.test import override_settings
+
+from newsticker import categories
+from newsticker.models import TickerCategory
+
+from .base import NewstickerTestCase
+
+
+class CategoryTreeCacheTest(NewstickerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.root = TickerCategory.add_root(name='Root')
+        self.child = self.root.add_child(name='Child')
+
+    def test_version_is_stable_for_unchanged_rows(self):
+        version = categories.get_category_tree().version
+        categories.invalidate_category_tree()
+        self.assertEqual(categories.get_category_tree().version, version)
+        self.child.name = 'Renamed'
+        self.child.save()
+        tree = categories.get_category_tree()
+        self.assertNotEqual(tree.version, version)
+        self.assertEqual(tree.get(self.child.pk).name, 'Renamed')
+
+    @override_settings(NEWSTICKER_CATEGORY_TREE_TIMEOUT=60)
+    def test_missed_invalidation_expires(self):
+        self.assertEqual(categories.get_category_tree().get(self.child.pk).name, 'Child')
+        # renamed by another worker whose invalidation only reached its own (per-process) cache
+        TickerCategory.objects.filter(pk=self.child.pk).update(name='Renamed')
+        self.assertEqual(categories.get_category_tree().get(self.child.pk).name, 'Child')
+        with mock.patch('django.core.cache.backends.locmem.time.time', return_value=time.time() + 61):
+            self.assertEqual(categories.get_category_tree().get(self.child.pk).name, 'Renamed')
@@ -0,0 +1,76 @@
+import datetime
+import threading
+from unittest import mock
+
+from django.db import DatabaseError
+from django.utils import timezone
+
+from newsticker.clicks import BufferedClickRecorder
+from newsticker.models import ShareLink, ShareLinkClick
+
+from .base import REF_DATE, NewstickerTestCase
+
+
+class BufferedClickRecorderTest(NewstickerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.sharelink = ShareLink(valid_until=timezone.now() + datetime.timedelta(days=1), display_date=REF_DATE)
+        self.sharelink.save()
+
+    def click(self):
+        return ShareLinkClick(sharelink_id=self.sharelink.pk, user_agent='test')
+
+    def recorder(self, **params):
+        # without the flusher thread, which can't write to the test transaction
+        patcher = mock.patch.object(BufferedClickRecorder, '_ensure_thread')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return BufferedClickRecorder(**params)
+
+    def assertStored(self, count):
+        self.sharelink.refresh_from_db()
+        self.assertEqual(self.sharelink.clicks_counter, count)
+        self.assertEqual(ShareLinkClick.objects.filter(sharelink=self.sharelink).count(), count)
+
+    def test_flush_size_wakes_flusher(self):
+        recorder = BufferedClickRecorder(flush_interval=60, flush_size=3)
+        flushed = threading.Event()
+        with mock.patch.object(recorder, 'flush', side_effect=flushed.set):
+            recorder.record(self.click())
+            recorder.record(self.click())
+            self.assertFalse(flushed.wait(0.2))
+            recorder.record(self.click())
+            self.assertTrue(flushed.wait(5))
+            recorder.stop()
+        self.assertFalse(recorder.thread.is_alive())
+
+    def test_stop_flushes_remaining(self):
+        recorder = self.recorder(flush_interval=60, flush_size=100)
+        for _ in range(3):
+            recorder.record(self.click())
+        self.assertStored(0)
+        recorder.stop()
+        self.assertStored(3)
+        self.assertEqual(recorder.buffer, [])
+
+    def test_failed_flush_keeps_clicks(self):
+        recorder = self.recorder()
+        for _ in range(3):
+            recorder.record(self.click())
+        with mock.patch.object(ShareLink.objects, 'filter', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                recorder.flush()
+        self.assertStored(0)
+        self.assertEqual(len(recorder.buffer), 3)
+        self.assertEqual(recorder.flush(), 3)
+        self.assertStored(3)
+
+    def test_failed_flush_is_capped(self):
+        recorder = self.recorder(max_buffer=2)
+        clicks = [self.click() for _ in range(3)]
+        for click in clicks:
+            recorder.record(click)
+        with mock.patch.object(ShareLinkClick.objects, 'bulk_create', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                recorder.flush()
+        self.assertEqual(recorder.buffer, clicks[1:])
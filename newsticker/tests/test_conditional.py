@@ -0,0 +1,30 @@
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.utils.http import http_date, parse_http_date
+
+from newsticker.conditional import window_response
+from newsticker.models import TickerItem
+
+from .base import REF_DATE, NewstickerTestCase
+
+
+class WindowResponseTest(NewstickerTestCase):
+    seed = 4
+
+    def get(self, **headers):
+        request = RequestFactory().get('/news/', headers=headers)
+        return window_response(request, lambda fingerprint: HttpResponse('page'), ref_date=REF_DATE, limit_days=2)
+
+    def test_etag_match_is_not_modified(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get(if_none_match=response['ETag']).status_code, 304)
+
+    def test_deletion_is_modified(self):
+        response = self.get()
+        # the newest modified_dt stays, so Last-Modified doesn't change
+        TickerItem.objects.current(ref_date=REF_DATE, limit_days=2).order_by('modified_dt', 'pk').first().delete()
+        self.assertEqual(self.get(if_none_match=response['ETag']).status_code, 200)
+        # rounded up, Last-Modified drops the microseconds of modified_dt
+        if_modified_since = http_date(parse_http_date(response['Last-Modified']) + 1)
+        self.assertEqual(self.get(if_modified_since=if_modified_since).status_code, 200)
@@ -0,0 +1,61 @@
+import time
+from unittest import mock
+
+from django.test import override_settings
+
+from newsticker import daycache
+from newsticker.models import TickerItem
+
+from .base import REF_DATE, NewstickerTestCase
+
+
+class RenderWindowTest(NewstickerTestCase):
+    seed = 17
+
+    def setUp(self):
+        super().setUp()
+        self.rendered = []
+
+    def render_day(self, date, categories):
+        self.rendered.append(date)
+        return '|'.join(item.headline for items in categories.values() for item in items)
+
+    def render_window(self):
+        self.rendered = []
+        return dict(daycache.render_window(self.render_day, ref_date=REF_DATE, limit_days=2))
+
+    def later(self, seconds):
+        # the locmem cache's clock, to let entries expire
+        return mock.patch('django.core.cache.backends.locmem.time.time', return_value=time.time() + seconds)
+
+    def edit_item(self):
+        item = TickerItem.objects.filter(pk__in=self.dataset.item_ids).order_by('pub_dt').last()
+        item.headline = 'Edited headline'
+        item.save()
+        return daycache.local_date(item.pub_dt)
+
+    def test_cached_days_are_not_rendered(self):
+        fragments = self.render_window()
+        self.assertEqual(len(self.rendered), 3)
+        self.assertEqual(self.render_window(), fragments)
+        self.assertEqual(self.rendered, [])
+
+    def test_save_rerenders_its_day(self):
+        self.render_window()
+        date = self.edit_item()
+        fragments = self.render_window()
+        self.assertEqual(self.rendered, [date])
+        self.assertIn('Edited headline', fragments[date])
+
+    @override_settings(NEWSTICKER_DAY_CACHE_VERSION_TIMEOUT=60)
+    def test_missed_invalidation_expires(self):
+        self.render_window()
+        # saved by another worker whose invalidation only reached its own (per-process) cache
+        with mock.patch.object(daycache, 'invalidate_days'):
+            date = self.edit_item()
+        self.assertNotIn('Edited headline', self.render_window()[date])
+        with self.later(61):
+            fragments = self.render_window()
+        # the unchanged days keep their versions and fragments
+        self.assertEqual(self.rendered, [date])
+        self.assertIn('Edited headline', fragments[date])
@@ -0,0 +1,46 @@
+import datetime
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from newsticker import digests
+from newsticker.models import TickerItem
+
+from .base import REF_DATE, NewstickerTestCase
+
+
+def grouping(by_date):
+    return [
+        (date, category.pk, [item.pk for item in items])
+        for date, categories in by_date.items()
+        for category, items in categories.items()
+    ]
+
+
+class DigestTest(NewstickerTestCase):
+    seed = 2
+    items = 40
+
+    def assertDigestsMatch(self):
+        self.assertEqual(
+            grouping(TickerItem.objects.digest_by_date(ref_date=REF_DATE, limit_days=2)),
+            grouping(TickerItem.objects.current_by_date(ref_date=REF_DATE, limit_days=2)),
+        )
+
+    def test_maintained_on_save_and_delete(self):
+        self.assertDigestsMatch()
+        item = TickerItem.objects.filter(pk__in=self.dataset.item_ids).order_by('pk').first()
+        item.category_id = next(pk for pk in self.dataset.category_ids if pk != item.category_id)
+        item.pub_dt -= datetime.timedelta(days=1)
+        item.save()
+        self.assertDigestsMatch()
+        item.delete()
+        self.assertDigestsMatch()
+
+    def test_refresh_locks_categories_before_reading(self):
+        item = TickerItem.objects.get(pk=self.dataset.item_ids[0])
+        with CaptureQueriesContext(connection) as queries:
+            digests.refresh_items([item])
+        statements = [query['sql'] for query in queries if not query['sql'].startswith(('SAVEPOINT', 'RELEASE'))]
+        self.assertIn('newsticker_tickercategory', statements[0])
+        self.assertIn('newsticker_tickeritem', statements[1])
@@ -0,0 +1,68 @@
+import datetime
+import json
+from unittest import mock
+
+from django.utils import timezone
+from django.utils.http import http_date, parse_http_date
+
+from newsticker import feeds
+from newsticker.models import TickerItem
+
+from .base import REF_DATE, NewstickerTestCase
+
+
+class FeedTest(NewstickerTestCase):
+    seed = 5
+    items = 30
+
+    def get_json(self, **params):
+        response = self.client.get('/news/feed.json', params)
+        return response, json.loads(b''.join(response.streaming_content))
+
+    def poll(self, cursor=None, limit=7):
+        # all items after cursor, page by page: (item ids, cursor for the next poll)
+        seen = []
+        while True:
+            response, data = self.get_json(limit=limit, **({'since': cursor} if cursor else {}))
+            seen += [item['id'] for item in data['items']]
+            cursor = data['next_cursor']
+            if not data['more']:
+                return seen, cursor
+
+    def create_item(self, **fields):
+        template = TickerItem.objects.first()
+        return TickerItem.objects.create(
+            category_id=template.category_id, publication_id=template.publication_id,
+            item_type_id=template.item_type_id, headline='New', **fields
+        )
+
+    def test_cursor_walks_all_items(self):
+        seen, cursor = self.poll()
+        self.assertEqual(len(seen), len(set(seen)))
+        self.assertEqual(len(seen), feeds.feed_queryset().count())
+        response, data = self.get_json(since=cursor)
+        self.assertEqual(data['items'], [])
+        self.assertEqual(data['next_cursor'], cursor)
+
+    def test_backdated_item_is_delivered(self):
+        seen, cursor = self.poll()
+        # e.g. an agency item ingested with its wire timestamp, older than the items seen so far
+        pub_dt = timezone.make_aware(datetime.datetime.combine(REF_DATE, datetime.time())) - datetime.timedelta(days=10)
+        item = self.create_item(pub_dt=pub_dt)
+        self.assertEqual(self.poll(cursor), ([item.pk], mock.ANY))
+
+    def test_scheduled_item_is_delivered_once_published(self):
+        scheduled = self.create_item(pub_dt=timezone.now() + datetime.timedelta(hours=1))
+        later = self.create_item(pub_dt=timezone.now())
+        seen, cursor = self.poll()
+        self.assertIn(later.pk, seen)
+        self.assertNotIn(scheduled.pk, seen)
+        with mock.patch('django.utils.timezone.now', return_value=timezone.now() + datetime.timedelta(hours=2)):
+            self.assertEqual(self.poll(cursor), ([scheduled.pk], mock.ANY))
+
+    def test_deletion_is_modified(self):
+        response, data = self.get_json(limit=10)
+        self.assertEqual(self.client.get('/news/feed.json', {'limit': 10}, headers={'if_none_match': response['ETag']}).status_code, 304)
+        TickerItem.objects.filter(pk=data['items'][0]['id']).order_by().first().delete()
+        if_modified_since = http_date(parse_http_date(response['Last-Modified']) + 1)
+        self.assertEqual(self.client.get('/news/feed.json', {'limit': 10}, headers={'if_modified_since': if_modified_since}).status_code, 200)
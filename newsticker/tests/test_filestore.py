@@ -0,0 +1,54 @@
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+from newsticker import filestore
+from newsticker.models import StoredFile, TickerItem, TickerRef
+
+from .base import NewstickerTestCase
+
+
+class FileStoreTest(NewstickerTestCase):
+    seed = 6
+    items = 2
+    generate_params = {'days': 1}
+
+    def setUp(self):
+        self.use_temp_media_root()
+        super().setUp()
+        self.item = TickerItem.objects.first()
+
+    def upload(self, content, name='file.pdf'):
+        ref = TickerRef(item=self.item, ref_type='pdf')
+        ref.uploadfile.save(name, ContentFile(content))
+        return ref
+
+    def test_equal_content_is_stored_once(self):
+        a = self.upload(b'%PDF same', 'a.pdf')
+        b = self.upload(b'%PDF same', 'b.PDF')
+        self.assertEqual(a.uploadfile.name, b.uploadfile.name)
+        self.assertTrue(filestore.is_content_addressed(a.uploadfile.name))
+        self.assertEqual(StoredFile.objects.get(name=a.uploadfile.name).refcount, 2)
+        a.delete()
+        self.assertEqual(StoredFile.objects.get(name=b.uploadfile.name).refcount, 1)
+        # cascaded deletes release too
+        with self.captureOnCommitCallbacks(execute=True):
+            self.item.delete()
+        self.assertFalse(StoredFile.objects.filter(name=b.uploadfile.name).exists())
+        self.assertFalse(default_storage.exists(b.uploadfile.name))
+
+    def test_upload_to_file_of_other_refs_is_kept(self):
+        legacy = default_storage.save('newsticker/files/7/legacy.pdf', ContentFile(b'%PDF legacy'))
+        a = TickerRef.objects.create(item=self.item, ref_type='pdf')
+        TickerRef.objects.filter(pk=a.pk).update(uploadfile=legacy)
+        a = TickerRef.objects.get(pk=a.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            b = TickerRef.objects.create(item=self.item, ref_type='pdf', uploadfile=a.uploadfile.name)
+        self.assertTrue(filestore.is_content_addressed(b.uploadfile.name))
+        self.assertTrue(default_storage.exists(legacy))
+
+    def test_deferred_save_keeps_refcount(self):
+        a = self.upload(b'%PDF deferred')
+        ref = TickerRef.objects.defer('uploadfile').get(pk=a.pk)
+        ref.title = 'Title'
+        ref.save()
+        self.assertEqual(StoredFile.objects.get(name=a.uploadfile.name).refcount, 1)
@@ -0,0 +1,44 @@
+import json
+
+from newsticker.ingest import ingest
+from newsticker.models import TickerCategory, TickerItem, TickerItemType, TickerPublication
+
+from .base import NewstickerTestCase
+
+
+class IngestTest(NewstickerTestCase):
+    def setUp(self):
+        super().setUp()
+        TickerCategory.add_root(name='Leaf')
+        TickerPublication.objects.create(name='dpa', url='https://example.org')
+        TickerItemType.objects.create(name='Meldung', color='000000')
+
+    def record(self, external_id, **fields):
+        data = {
+            'external_id': external_id, 'category': 'Leaf', 'publication': 'dpa', 'item_type': 'Meldung',
+            'pub_dt': '2026-03-16T10:00:00', 'headline': f'Meldung {external_id}',
+        }
+        data.update(fields)
+        return json.dumps(data)
+
+    def test_bad_values_only_fail_their_line(self):
+        lines = [
+            self.record('b1', refs=[{'ref_type': 'website', 'url': 'https://example.org/1'}]),
+            self.record('b2', refs=[{'ref_type': 'website', 'index': 'first'}]),
+            self.record('b3'),
+            self.record('b4', pub_dt=12345),
+            self.record('b5', pub_dt='2026-13-45T10:00:00'),
+            self.record('b6', refs=[{'ref_type': 'website', 'title': 't' * 300}]),
+            self.record('b7', refs=[{'ref_type': 'tickeritem', 'linked_tickeritem': '5'}]),
+            'not json',
+            self.record('b9', headline='h' * 256),
+        ]
+        result = ingest(lines, batch_size=100)
+        self.assertEqual((result.created, result.refs, result.failed), (2, 1, 7))
+        self.assertEqual([lineno for lineno, message in result.errors], [2, 4, 5, 6, 7, 8, 9])
+        self.assertEqual(set(TickerItem.objects.values_list('external_id', flat=True)), {'b1', 'b3'})
+
+    def test_existing_external_ids_are_skipped(self):
+        ingest([self.record('a1')])
+        result = ingest([self.record('a1'), self.record('a2'), self.record('a2')])
+        self.assertEqual((result.created, result.skipped), (1, 2))
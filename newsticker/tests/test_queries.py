@@ -0,0 +1,55 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from newsticker.models import TickerItem
+
+from .base import REF_DATE, NewstickerTestCase
+
+
+class CurrentByDateQueryCountTest(NewstickerTestCase):
+    def render_window(self):
+        by_date = TickerItem.objects.current_by_date(ref_date=REF_DATE, limit_days=2)
+        items = 0
+        for categories in by_date.values():
+            for category, category_items in categories.items():
+                str(category)
+                for item in category_items:
+                    items += 1
+                    (item.publication.name, item.item_type.name)
+                    item.get_rendered_summary()
+                    for ref in item.tickerref_set.all():
+                        ref.get_href()
+                        ref.get_ref_title()
+        return items
+
+    def count_queries(self, items):
+        self.generate_data(items, items)
+        # category tree cache, filled by the first request after a change
+        self.render_window()
+        with CaptureQueriesContext(connection) as queries:
+            rendered = self.render_window()
+        self.assertEqual(rendered, TickerItem.objects.current(ref_date=REF_DATE, limit_days=2).count())
+        return len(queries)
+
+    def test_query_count_is_flat(self):
+        # 10 items, then 1,000 in the same window: same queries (items and prefetched refs)
+        small = self.count_queries(10)
+        self.assertEqual(small, 2)
+        self.assertEqual(self.count_queries(990), small)
+        self.assertEqual(TickerItem.objects.count(), 1000)
+
+
+class CurrentPlanTest(NewstickerTestCase):
+    def assertUsesIndex(self, qs, index_name):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                # an empty table is scanned sequentially otherwise
+                cursor.execute('SET LOCAL enable_seqscan = off')
+        self.assertIn(index_name, qs.explain())
+
+    def test_window_uses_pub_dt_index(self):
+        self.assertUsesIndex(TickerItem.objects.current(ref_date=REF_DATE), 'newsticker_ti_pub_dt_cat_idx')
+
+    def test_category_window_uses_category_index(self):
+        qs = TickerItem.objects.current(ref_date=REF_DATE, limit_category_ids=[1, 2])
+        self.assertUsesIndex(qs, 'newsticker_ti_cat_pub_dt_idx')
@@ -0,0 +1,27 @@
+from django.test import SimpleTestCase
+
+from newsticker import rendering
+from newsticker.benchmarks.corpus import summary_corpus
+
+
+class FastRenderTest(SimpleTestCase):
+    def assertSameAsSoup(self, summary, specs=()):
+        specs = list(specs)
+        self.assertEqual(rendering.render_fast(summary, specs), rendering.render_soup(summary, specs), summary)
+
+    def test_corpus(self):
+        for summary, specs in summary_corpus(200):
+            self.assertSameAsSoup(summary, specs)
+
+    def test_corpus_crlf(self):
+        # summaries pasted from Windows clients keep their line endings
+        for summary, specs in summary_corpus(200, seed=1):
+            self.assertSameAsSoup(summary.replace('\n', '\r\n'), specs)
+
+    def test_line_endings(self):
+        for summary in ['<p>a\r\nb</p>\r\n<p>c</p>', '<p>\r</p>', '<p>a</p>\r<p>b</p>', '<p title="a\r\nb">x</p>']:
+            self.assertSameAsSoup(summary)
+
+    def test_comments(self):
+        for summary in ['<p>a<!----></p>', '<p>a<!-- \n --></p>', '<!-- \r\n -->', '<!--\t-->', '<p>a<!-- x --></p>']:
+            self.assertSameAsSoup(summary)
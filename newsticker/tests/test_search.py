@@ -0,0 +1,90 @@
+import datetime
+
+from django.db import connection
+from django.utils import timezone
+
+from newsticker import search
+from newsticker.models import TickerItem
+
+from .base import NewstickerTestCase
+
+
+class SqliteSearchTest(NewstickerTestCase):
+    seed = 11
+    items = 10
+
+    def setUp(self):
+        super().setUp()
+        if connection.vendor != 'sqlite' or not search.sqlite_has_fts5():
+            self.skipTest('needs SQLite with FTS5')
+        self.item = TickerItem.objects.get(pk=self.dataset.item_ids[0])
+        self.set_headline('Quokka sichtet Wombat')
+
+    def set_headline(self, headline):
+        self.item.headline = headline
+        self.item.save()
+
+    def found(self, query):
+        return list(search.SqliteSearchBackend().filter(TickerItem.objects.all(), query).values_list('pk', flat=True))
+
+    def fts_rowids(self, term):
+        # straight from the FTS5 index, not through the content table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT rowid FROM newsticker_tickeritem_fts WHERE newsticker_tickeritem_fts MATCH %s', [f'"{term}"'])
+            return [row[0] for row in cursor.fetchall()]
+
+    def test_headline_edit_updates_index(self):
+        self.assertEqual(self.fts_rowids('quokka'), [self.item.pk])
+        self.set_headline('Ameisenbär sichtet Wombat')
+        self.assertEqual(self.fts_rowids('quokka'), [])
+        self.assertEqual(self.fts_rowids('ameisenbar'), [self.item.pk])
+        self.assertEqual(self.found('ameisenbär'), [self.item.pk])
+
+    def test_delete_removes_row(self):
+        self.item.delete()
+        self.assertEqual(self.fts_rowids('quokka'), [])
+        self.assertEqual(self.found('quokka'), [])
+
+    def test_prefix_terms_are_anded(self):
+        self.assertEqual(self.found('quok'), [self.item.pk])
+        self.assertEqual(self.found('QUOKKA wom'), [self.item.pk])
+        self.assertEqual(self.found('quokka koala'), [])
+
+    def test_query_syntax_is_quoted(self):
+        # FTS5 operators, column filters and quotes are plain terms
+        for query in ['quokka"', '"quokka', 'quok*', '(quokka', '^quokka', 'quokka:', 'wombat)']:
+            self.assertEqual(self.found(query), [self.item.pk], query)
+        for query in ['koala OR quokka', 'quokka NOT koala', 'text:quokka', 'NEAR(quokka wombat)', '"']:
+            self.assertEqual(self.found(query), [], query)
+
+
+class SearchViewTest(NewstickerTestCase):
+    seed = 12
+    items = 10
+
+    def setUp(self):
+        super().setUp()
+        self.item = TickerItem.objects.get(pk=self.dataset.item_ids[0])
+        self.item.headline = 'Quokka sichtet Wombat'
+        self.item.save()
+
+    def get(self, **params):
+        return self.client.get('/news/search.json', params)
+
+    def test_search(self):
+        response = self.get(q='quokka')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['query'], 'quokka')
+        self.assertEqual([item['id'] for item in data['items']], [self.item.pk])
+        self.assertEqual(data['items'][0]['headline'], 'Quokka sichtet Wombat')
+
+    def test_scheduled_items_are_hidden(self):
+        self.item.pub_dt = timezone.now() + datetime.timedelta(days=1)
+        self.item.save()
+        self.assertEqual(self.get(q='quokka').json()['items'], [])
+
+    def test_bad_requests(self):
+        self.assertEqual(self.get(q=' ').status_code, 400)
+        self.assertEqual(self.get(q='quokka', limit='x').status_code, 400)
@@ -0,0 +1,72 @@
+import datetime
+import time
+from unittest import mock
+
+from django.test import override_settings
+from django.utils import timezone
+
+from newsticker.models import ShareLink
+
+from .base import REF_DATE, NewstickerTestCase
+
+
+class ShareLinkTest(NewstickerTestCase):
+    def test_str_without_short(self):
+        sharelink = ShareLink(valid_until=timezone.now() + datetime.timedelta(days=1), display_date=REF_DATE)
+        self.assertEqual(str(sharelink), '')
+        sharelink.save()
+        self.assertEqual(str(sharelink), sharelink.short)
+
+
+class ShareLinkResolveTest(NewstickerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.sharelink = self.create(datetime.timedelta(days=1))
+
+    def create(self, valid_for):
+        sharelink = ShareLink(valid_until=timezone.now() + valid_for, display_date=REF_DATE)
+        sharelink.save()
+        return sharelink
+
+    def later(self, seconds):
+        # the locmem cache's clock, to let entries expire
+        return mock.patch('django.core.cache.backends.locmem.time.time', return_value=time.time() + seconds)
+
+    def test_hit(self):
+        with self.assertNumQueries(1):
+            resolved = ShareLink.objects.resolve(self.sharelink.short)
+        self.assertEqual((resolved.pk, resolved.display_date), (self.sharelink.pk, REF_DATE))
+        with self.assertNumQueries(0):
+            self.assertEqual(ShareLink.objects.resolve(self.sharelink.short), resolved)
+
+    @override_settings(NEWSTICKER_SHARELINK_NEGATIVE_CACHE_TTL=60)
+    def test_miss_is_cached_negatively(self):
+        with self.assertNumQueries(1):
+            self.assertIsNone(ShareLink.objects.resolve('zzzzz'))
+        with self.assertNumQueries(0):
+            self.assertIsNone(ShareLink.objects.resolve('zzzzz'))
+        ShareLink.objects.filter(pk=self.sharelink.pk).update(short='zzzzz')
+        self.assertIsNone(ShareLink.objects.resolve('zzzzz'))
+        with self.later(61):
+            self.assertEqual(ShareLink.objects.resolve('zzzzz').pk, self.sharelink.pk)
+
+    @override_settings(NEWSTICKER_SHARELINK_CACHE_TTL=3600)
+    def test_entry_expires_with_the_link(self):
+        sharelink = self.create(datetime.timedelta(seconds=30))
+        self.assertTrue(ShareLink.objects.resolve(sharelink.short).is_valid())
+        now = timezone.now() + datetime.timedelta(seconds=31)
+        with self.later(31), mock.patch('django.utils.timezone.now', return_value=now):
+            with self.assertNumQueries(1):
+                self.assertFalse(ShareLink.objects.resolve(sharelink.short).is_valid())
+
+    def test_save_invalidates(self):
+        ShareLink.objects.resolve(self.sharelink.short)
+        self.sharelink.display_days = 3
+        self.sharelink.save()
+        self.assertEqual(ShareLink.objects.resolve(self.sharelink.short).display_days, 3)
+
+    def test_queryset_delete_invalidates(self):
+        ShareLink.objects.resolve(self.sharelink.short)
+        # e.g. the admin's "delete selected" action
+        ShareLink.objects.filter(pk=self.sharelink.pk).delete()
+        self.assertIsNone(ShareLink.objects.resolve(self.sharelink.short))
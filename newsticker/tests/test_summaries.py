@@ -0,0 +1,108 @@
+import datetime
+from unittest import mock
+
+from django.urls import clear_script_prefix, reverse, set_script_prefix
+
+from newsticker.models import TickerItem, TickerRef
+
+from .base import REF_DATE, NewstickerTestCase
+
+
+class PersistedSummaryTest(NewstickerTestCase):
+    seed = 3
+    items = 30
+    # links to items of earlier batches
+    generate_params = {'batch_size': 10}
+
+    def setUp(self):
+        super().setUp()
+        self.item = TickerItem.objects.with_relations().filter(
+            tickerref_set__linked_tickeritem__isnull=False, tickerref_set__is_in_summary=True,
+        ).first()
+
+    def test_stored_rendering_is_used(self):
+        self.assertIn('href="/news/?date=', self.item.rendered_summary)
+        self.assertEqual(self.item.get_rendered_summary(), self.item.rendered_summary)
+
+    def test_other_script_prefix_renders_on_the_fly(self):
+        set_script_prefix('/sub/')
+        try:
+            rendered = self.item.get_rendered_summary()
+        finally:
+            clear_script_prefix()
+        self.assertNotEqual(rendered, self.item.rendered_summary)
+        self.assertIn('href="/sub/news/?date=', rendered)
+        self.assertNotIn('href="/news/', rendered)
+
+    def test_read_path_reverses_once(self):
+        by_date = TickerItem.objects.current_by_date(ref_date=REF_DATE, limit_days=2)
+        items = [item for categories in by_date.values() for group in categories.values() for item in group]
+        self.assertGreater(len(items), 10)
+        set_script_prefix('/other/')
+        try:
+            with mock.patch('newsticker.urlbuilder.reverse', wraps=reverse) as reverse_mock:
+                for item in items:
+                    item.get_rendered_summary()
+        finally:
+            clear_script_prefix()
+        self.assertEqual(reverse_mock.call_count, 1)
+
+
+class DependentSummaryTest(NewstickerTestCase):
+    seed = 3
+    items = 30
+    generate_params = {'batch_size': 10}
+
+    def setUp(self):
+        super().setUp()
+        ref = TickerRef.objects.filter(linked_tickeritem__isnull=False, is_in_summary=True, title__isnull=True).first()
+        self.dependent = ref.item
+        self.target = ref.linked_tickeritem
+
+    def assertStoredRendering(self, *expected, absent=()):
+        dependent = TickerItem.objects.with_relations().get(pk=self.dependent.pk)
+        self.assertEqual(dependent.get_rendered_summary(), dependent.rendered_summary)
+        for text in expected:
+            self.assertIn(text, dependent.rendered_summary)
+        for text in absent:
+            self.assertNotIn(text, dependent.rendered_summary)
+
+    def test_headline_edit_rerenders_dependents(self):
+        self.target.headline = 'Edited headline'
+        self.target.save()
+        self.assertStoredRendering('News Ticker: Edited headline, vom ')
+
+    def test_pub_dt_edit_rerenders_dependents(self):
+        old_date = self.target.pub_dt.strftime('%Y-%m-%d')
+        self.assertStoredRendering(f'date={old_date}&amp;')
+        self.target.pub_dt -= datetime.timedelta(days=1)
+        self.target.save()
+        new_date = self.target.pub_dt.strftime('%Y-%m-%d')
+        self.assertStoredRendering(f'date={new_date}&amp;', f', vom {new_date}"', absent=[f'date={old_date}&amp;'])
+
+    def test_deleted_target_is_unlinked(self):
+        title = f'News Ticker: {self.target.headline}, vom '
+        self.assertStoredRendering(title)
+        self.target.delete()
+        self.assertStoredRendering(absent=[title])
+
+
+class DependentIdsTest(NewstickerTestCase):
+    # one batch, so the generated items don't link to each other
+    seed = 4
+    items = 4
+
+    def link(self, item_id, target_id):
+        TickerRef.objects.create(item_id=item_id, ref_type='tickeritem', linked_tickeritem_id=target_id)
+
+    def test_cycle(self):
+        a, b, c, d = self.dataset.item_ids
+        # b -> a, c -> b, a -> c and d -> c
+        self.link(b, a)
+        self.link(c, b)
+        self.link(a, c)
+        self.link(d, c)
+        self.assertEqual(TickerItem.objects.get_dependent_ids([a]), {b})
+        self.assertEqual(TickerItem.objects.get_dependent_ids([a], max_depth=2), {b, c})
+        self.assertEqual(TickerItem.objects.get_dependent_ids([a], max_depth=None), {b, c, d})
+        self.assertEqual(TickerItem.objects.get_dependent_ids([c], max_depth=None), {a, b, d})
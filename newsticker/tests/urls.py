@@ -0,0 +1,16 @@
+from django.http import HttpResponse
+from django.urls import include, path
+
+
+def overview(request, short=None):
+    return HttpResponse()
+
+
+# stands in for the overview app that includes newsticker.urls
+urlpatterns = [
+    path('news/', include(([
+        path('', overview, name='newsticker_index'),
+        path('s/<str:short>/', overview, name='newsticker_share'),
+        path('', include('newsticker.urls')),
+    ], 'gruene_cms_news'))),
+]
@@ -0,0 +1,66 @@
+import weakref
+from urllib.parse import quote_plus
+
+from django.urls import get_resolver, get_script_prefix, get_urlconf, reverse
+from django.utils.functional import cached_property
+from django.utils.translation import get_language
+
+
+# resolver -> {(view name, script prefix, language): url}, clear_url_caches() (URLconf reloads,
+# ROOT_URLCONF overrides) gives a new resolver and so drops the memoized URLs
+_base_urls = weakref.WeakKeyDictionary()
+
+
+def overview_base_url(view_name='gruene_cms_news:newsticker_index'):
+    # reverse() of the overview, memoized on what its result depends on, so per-item callers like
+    # summary fingerprints don't reverse again
+    urlconf = get_urlconf()
+    resolver = get_resolver(urlconf)
+    urls = _base_urls.get(resolver)
+    if urls is None:
+        urls = _base_urls[resolver] = {}
+    key = (view_name, get_script_prefix(), get_language())
+    url = urls.get(key)
+    if url is None:
+        url = urls[key] = reverse(view_name, urlconf=urlconf)
+    return url
+
+
+class OverviewUrlBuilder:
+    # Same URLs as TickerItem.get_overview_url() and TickerRef.get_href(), but reverse() runs once
+    # per builder and nothing touches lazy relations (category_id instead of category)
+    def __init__(self, short_link=None, view_name='gruene_cms_news:newsticker_index'):
+        self.view_name = view_name
+        self.short_link = short_link
+
+    @cached_property
+    def base_url(self):
+        return overview_base_url(self.view_name)
+
+    def item_url(self, item, collape_cat=False, short_link=None):
+        short_link = short_link or item.short_link or self.short_link
+        url = f'{self.base_url}?date={item.pub_dt.strftime("%Y-%m-%d")}&days=0&show_all=on'
+        if short_link:
+            url += f'&s={quote_plus(short_link.short)}'
+        if collape_cat:
+            url += f'&collapse_cat={item.category_id}'
+        return url + f'#ti-{item.pk}'
+
+    def ref_href(self, ref, short_link=None):
+        if ref.uploadfile:
+            return ref.uploadfile.url
+        if ref.url:
+            return ref.url
+        if ref.linked_tickeritem_id:
+            return self.item_url(ref.linked_tickeritem, short_link=short_link or self.short_link)
+        return None
+
+    def build(self, by_date, collape_cat=False):
+        # Sets overview_url on every item and href on every prefetched ref of a current_by_date() result
+        for categories in by_date.values():
+            for items in categories.values():
+                for item in items:
+                    item.overview_url = self.item_url(item, collape_cat=collape_cat)
+                    for ref in item.tickerref_set.all():
+                        ref.href = self.ref_href(ref, short_link=item.short_link)
+        return by_date
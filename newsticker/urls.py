@@ -0,0 +1,11 @@
+from django.urls import path
+
+from . import views
+
+
+# no app_name, include these in the namespace of the overview (e.g. gruene_cms_news)
+urlpatterns = [
+    path('feed.json', views.feed_json, name='newsticker_feed_json'),
+    path('feed.rss', views.feed_rss, name='newsticker_feed_rss'),
+    path('search.json', views.search_json, name='newsticker_search_json'),
+]
@@ -0,0 +1,107 @@
+from django.http import HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+
+from . import categories, feeds, models, search
+from .urlbuilder import OverviewUrlBuilder
+
+
+def _feed_params(request):
+    # (since cursor string, decoded cursor, limit, category ids), raises ValueError
+    since = request.GET.get('since') or None
+    limit = min(int(request.GET.get('limit', feeds.get_default_limit())), feeds.get_max_limit())
+    if limit < 1:
+        raise ValueError('limit has to be positive')
+    category_ids = None
+    if request.GET.getlist('category'):
+        tree = categories.get_category_tree()
+        category_ids = tree.expand_ids(int(pk) for pk in request.GET.getlist('category'))
+    cursor = None
+    if since:
+        try:
+            cursor = feeds.decode_cursor(since)
+        except OverflowError:
+            raise ValueError('invalid cursor')
+    return since, cursor, limit, category_ids
+
+
+def _conditional(request, qs, limit, params):
+    etag, last_modified = feeds.fingerprint(qs, limit, params)
+    etag = f'"{etag}"'
+    last_modified = last_modified.timestamp() if last_modified else None
+    # only the ETag, Last-Modified doesn't move when items are deleted (see conditional.window_response)
+    return etag, last_modified, get_conditional_response(request, etag=etag)
+
+
+def _set_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+@require_safe
+def feed_json(request):
+    # ?since=<next_cursor of the previous response>&limit=&category=<id>...
+    try:
+        since, cursor, limit, category_ids = _feed_params(request)
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+
+    qs = feeds.feed_queryset(since=cursor, limit_category_ids=category_ids)
+    params = {'since': since, 'category': sorted(category_ids) if category_ids is not None else None}
+    etag, last_modified, response = _conditional(request, qs, limit, params)
+    if response is None:
+        response = StreamingHttpResponse(
+            feeds.iter_json(
+                models.TickerItem.objects.with_relations(qs), limit,
+                since_cursor=since, absolute_uri=request.build_absolute_uri,
+            ),
+            content_type='application/json',
+        )
+    return _set_validators(response, etag, last_modified)
+
+
+@require_safe
+def feed_rss(request):
+    # the newest ?limit= items, ?category=<id>... like feed_json
+    try:
+        since, cursor, limit, category_ids = _feed_params(request)
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+
+    qs = feeds.latest_queryset(limit_category_ids=category_ids)
+    params = {'category': sorted(category_ids) if category_ids is not None else None}
+    etag, last_modified, response = _conditional(request, qs, limit, params)
+    if response is None:
+        items = models.TickerItem.objects.with_relations(qs)[:limit].iterator(chunk_size=100)
+        response = StreamingHttpResponse(
+            feeds.iter_rss(
+                items, title='News Ticker', link=request.build_absolute_uri('/'),
+                description='News Ticker', absolute_uri=request.build_absolute_uri,
+            ),
+            content_type='application/rss+xml; charset=utf-8',
+        )
+    return _set_validators(response, etag, last_modified)
+
+
+@require_safe
+def search_json(request):
+    # ?q=<terms>&limit=&category=<id>..., published items matching all terms (prefixes), newest first
+    query = request.GET.get('q', '').strip()
+    if not query:
+        return HttpResponseBadRequest('q is required')
+    try:
+        since, cursor, limit, category_ids = _feed_params(request)
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+
+    qs = search.search(feeds.latest_queryset(limit_category_ids=category_ids), query)
+    url_builder = OverviewUrlBuilder()
+    items = [
+        feeds.serialize_item(item, url_builder, request.build_absolute_uri)
+        for item in models.TickerItem.objects.with_relations(qs)[:limit]
+    ]
+    return JsonResponse({'query': query, 'items': items}, json_dumps_params={'ensure_ascii': False})